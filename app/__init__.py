@@ -12,18 +12,26 @@ from flask_migrate import Migrate
 from config import DevelopmentConfig
 from flask_apscheduler import APScheduler
 from logging_config import default_logger as logger
+from app.utils.compression import Compress
+from app.utils.request_timing import RequestTimer
 
 db = SQLAlchemy()
 migrate = Migrate()
 bcrypt = Bcrypt()
 jwt = JWTManager()
 login_manager = LoginManager()
+compress = Compress()
+request_timer = RequestTimer()
 
 from app.models import *
 
 def create_app(config_class=DevelopmentConfig):
     app = Flask(__name__)
     app.config.from_object(config_class)
+
+    if app.config.get('FAST_JSON_PROVIDER', True):
+        from app.utils.json_provider import FastJSONProvider
+        app.json = FastJSONProvider(app)
     
     db.init_app(app) 
     #db.create_all
@@ -32,18 +40,59 @@ def create_app(config_class=DevelopmentConfig):
     jwt.init_app(app)
     login_manager.init_app(app)
     CORS(app)
+    compress.init_app(app)
+    request_timer.init_app(app)
+
+    from app.services.intent_classifier import init_intent_classifier, train_intent_classifier_command
+    app.cli.add_command(train_intent_classifier_command)
+    if app.config.get('INTENT_CLASSIFIER_ENABLED'):
+        init_intent_classifier(app)
+
+    from app.services.chat_writer import init_chat_writer
+    init_chat_writer(app)
+
+    from app.services.leases import init_leader_election, is_scheduler_leader
+    init_leader_election(app)
 
+    # Every process runs the scheduler; jobs only do work in the one holding the scheduler lease
     scheduler = APScheduler()
     scheduler.init_app(app)
     scheduler.start()
 
-    from app.services.archive_service import archive_old_data
+    from app.services.archive_service import archive_old_data, archive_window_end, compact_archive_command, recover_unarchive_jobs, summarize_archive_command
+    from app.services.cold_storage import enforce_retention
+    app.cli.add_command(compact_archive_command)
+    app.cli.add_command(summarize_archive_command)
+
+    # Restores queued or started by processes that have since stopped; runs once, off the startup path
+    scheduler.add_job('recover_unarchive_jobs', recover_unarchive_jobs, args=[app])
+
+    # Every worker keeps its own view of plan changes, so this job runs in all of them
+    from app.services.auth_service import refresh_plan_changes
+    scheduler.add_job(
+        'refresh_plan_changes', refresh_plan_changes, args=[app],
+        trigger='interval', seconds=app.config.get('PLAN_CHANGE_POLL_SECONDS', 30)
+    )
     
-    @scheduler.task('cron', id='archive_old_data', hour=13)  # Run daily at 1 pm
+    # Every worker shares its request latencies, so the archiver pauses on the whole cluster's
+    from app.services.request_timings import publish_request_timings
+    scheduler.add_job(
+        'publish_request_timings', publish_request_timings, args=[app],
+        trigger='interval', seconds=app.config.get('REQUEST_TIMING_PUBLISH_SECONDS', 15)
+    )
+
+    # Polled, so a run starts soon after an archive window opens; it stops when the window closes
+    @scheduler.task('interval', id='archive_old_data', minutes=app.config.get('ARCHIVE_CHECK_INTERVAL_MINUTES', 15))
     def scheduled_archive():
         with app.app_context():
+            if not is_scheduler_leader():
+                return
+            deadline = archive_window_end()
+            if deadline is None:
+                return
             try:
-                archive_old_data()
+                archive_old_data(deadline)
+                enforce_retention()
                 logger.info("Scheduled archiving completed successfully.")
             except Exception as e:
                 logger.error(f"Scheduled archiving failed: {str(e)}")
@@ -3,6 +3,7 @@ from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER
 import uuid
 from datetime import datetime
 from app import db
+from app.utils.archive_codec import decode_document
 
 class ToDictMixin:
     def to_dict(self):
@@ -16,6 +17,10 @@ class ToDictMixin:
 class ArchivedInsight(db.Model,ToDictMixin):
     __bind_key__ = 'archive'
     __tablename__ = 'ArchivedInsights'
+    __table_args__ = (
+        db.Index('ix_ArchivedInsights_user_id_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_ArchivedInsights_user_id_archived_at', 'user_id', 'archived_at', 'id'),
+    )
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True)
     user_id = db.Column(UNIQUEIDENTIFIER, nullable=False) 
@@ -23,6 +28,18 @@ class ArchivedInsight(db.Model,ToDictMixin):
     updated_at = db.Column(db.DateTime) 
     archived_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Compact archives keep every child row in `document` and none in the Archived* tables;
+    # format_version is NULL for insights archived row by row
+    format_version = db.Column(db.Integer)
+    codec = db.Column(db.String(10))
+    document = db.deferred(db.Column(db.LargeBinary))
+
+    # Listing summary, written when the insight is archived so a page of the archive never
+    # reads child rows or documents. file_types holds the distinct lower-cased extensions
+    # wrapped in commas (',.csv,.xlsx,') so one LIKE matches a whole type
+    file_count = db.Column(db.Integer)
+    file_types = db.Column(db.String(255))
+
     files = db.relationship('ArchivedFile', back_populates='insight', cascade='all, delete-orphan')
     sales_data = db.relationship('ArchivedSalesData', back_populates='insight', cascade='all, delete-orphan')
     order_status = db.relationship('ArchivedOrderStatus', back_populates='insight', cascade='all, delete-orphan')
@@ -38,48 +55,66 @@ class ArchivedInsight(db.Model,ToDictMixin):
 
     ChatMessage = db.relationship("ArchivedChatMessage", back_populates="insight", cascade="all, delete-orphan")
      
+    def collections(self):
+        """
+        Child rows by relationship name. For compact archives they are decoded from
+        the document into detached objects, once per instance, instead of being
+        loaded from the Archived* tables.
+        """
+        relationships = {rel.key: rel.mapper.class_ for rel in ArchivedInsight.__mapper__.relationships}
+        if self.format_version is None:
+            return {key: getattr(self, key) for key in relationships}
+
+        if getattr(self, '_collections', None) is None:
+            decoded = decode_document(self.codec, self.document, list(relationships.values()), self.id)
+            self._collections = {
+                key: [model(**row) for row in decoded[model]] for key, model in relationships.items()
+            }
+        return self._collections
+
     # Update the get_analysis_data method
     def get_analysis_data(self):
+        children = self.collections()
         analysis_data = {
             'salesData': [
                 {'PRODUCTLINE': sd.product_line, 'SALES': float(sd.sales)}
-                for sd in self.sales_data
+                for sd in children['sales_data']
             ],
             'orderStatus': [
                 {'STATUS': os.status_type, 'count': os.status_count}
-                for os in self.order_status
+                for os in children['order_status']
             ],
             'salesOverTime': [
                 {'ORDERDATE': sot.order_date.strftime('%Y-%m-%d'), 'SALES': float(sot.daily_sales)}
-                for sot in self.sales_over_time
+                for sot in children['sales_over_time']
             ],
             'quantityVsPrice': [
                 {'QUANTITYORDERED': qpd.quantity_ordered, 'PRICEEACH': float(qpd.price_each)}
-                for qpd in self.quantity_price_data
+                for qpd in children['quantity_price_data']
             ],
             'itemFrequency': {
                 if_item.item_description: if_item.frequency
-                for if_item in self.item_frequencies
+                for if_item in children['item_frequencies']
             },
             'monthlySales': [
                 {'Date': ms.date.strftime('%Y-%m-%d'), 'count': ms.count}
-                for ms in self.monthly_sales
+                for ms in children['monthly_sales']
             ],
             'customerFrequency': {
                 cf.purchase_frequency: cf.customer_count
-                for cf in self.customer_frequencies
+                for cf in children['customer_frequencies']
             },
             'commonItemPairs': {
                 cp.item_pair: cp.pair_count
-                for cp in self.common_item_pairs
+                for cp in children['common_item_pairs']
             },
             'seasonalItems': {
                 si.month: si.item_description
-                for si in self.seasonal_items
+                for si in children['seasonal_items']
             },
             'customerSegments': {
                 cs.segment: cs.count
-                for cs in self.customer_segments
+                for cs in children['customer_segments']
             }
         }
         return analysis_data
@@ -91,7 +126,18 @@ class ArchivedInsight(db.Model,ToDictMixin):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'processing_result': self.get_analysis_data(),
-            'files': [file.to_dict() for file in self.files] 
+            'files': [file.to_dict() for file in self.collections()['files']] 
+        }
+
+    def to_summary_dict(self):
+        return {
+            'id': str(self.id),
+            'user_id': str(self.user_id),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
+            'file_count': self.file_count,
+            'file_types': self.file_types.strip(',').split(',') if self.file_types else []
         }
         
 class ArchivedFile(db.Model,ToDictMixin):
@@ -276,6 +322,7 @@ class ArchivedChatMessage(db.Model,ToDictMixin):
     user_message = db.Column(db.Text, nullable=False)
     bot_response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    sequence = db.Column(db.BigInteger)  # ChatMessage.sequence, kept so restores replay messages in order
     
     insight = db.relationship('ArchivedInsight', back_populates='ChatMessage')
     
@@ -287,4 +334,73 @@ class ArchivedChatMessage(db.Model,ToDictMixin):
             'bot_response': self.bot_response,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
-     
\ No newline at end of file
+
+class ArchiveRun(db.Model,ToDictMixin):
+    __bind_key__ = 'archive'
+    __tablename__ = 'ArchiveRuns'
+
+    id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, paused, failed or completed
+    cutoff = db.Column(db.DateTime, nullable=False)  # insights created before this are archived
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    # (created_at, id) of the last insight the run got past; a resumed run continues after it
+    checkpoint_created_at = db.Column(db.DateTime)
+    checkpoint_insight_id = db.Column(UNIQUEIDENTIFIER)
+
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    insights_archived = db.Column(db.Integer, nullable=False, default=0)
+    rows_archived = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_per_second = db.Column(db.Float)
+    backlog = db.Column(db.Integer)  # insights still to archive under the cutoff
+    error = db.Column(db.Text)
+
+    @property
+    def checkpoint(self):
+        if self.checkpoint_created_at is None:
+            return None
+        return self.checkpoint_created_at, self.checkpoint_insight_id
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'status': self.status,
+            'cutoff': self.cutoff.isoformat() if self.cutoff else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'batches': self.batches,
+            'insights_archived': self.insights_archived,
+            'rows_archived': self.rows_archived,
+            'rows_per_second': self.rows_per_second,
+            'backlog': self.backlog,
+            'error': self.error
+        }
+
+class UnarchiveJob(db.Model,ToDictMixin):
+    __bind_key__ = 'archive'
+    __tablename__ = 'UnarchiveJobs'
+
+    id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
+    insight_id = db.Column(UNIQUEIDENTIFIER, nullable=False)
+    user_id = db.Column(UNIQUEIDENTIFIER, nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed or failed
+    rows_restored = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'insight_id': str(self.insight_id),
+            'status': self.status,
+            'rows_restored': self.rows_restored,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -65,13 +65,13 @@ class UserRole(db.Model):
 class Subscription(db.Model):
     __tablename__ = 'Subscriptions'
     SubscriptionID = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    UserID = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Users.UserID'), nullable=False)
+    UserID = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Users.UserID'), nullable=False, index=True)
     PlanName = db.Column(db.String(50), nullable=False)
     Amount = db.Column(db.Float, nullable=False)
     StartDate = db.Column(db.DateTime, nullable=False)
     EndDate = db.Column(db.DateTime, nullable=False)
     Status = db.Column(db.String(20), nullable=False)
-    LastPaymentDate = db.Column(db.DateTime, nullable=False)
+    LastPaymentDate = db.Column(db.DateTime, nullable=False, index=True)  # also the plan version in access tokens
     PaymentReference = db.Column(db.String(100), nullable=False)
 
     def to_dict(self):
@@ -26,7 +26,7 @@ class File(db.Model,ToDictMixin):
     file_size = db.Column(db.Integer)  # in bytes
     file_type = db.Column(db.String(50))
     status = db.Column(db.String(50), default='Uploaded')
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
 
     insight = db.relationship('Insight', back_populates='files')
    
@@ -50,10 +50,13 @@ class File(db.Model,ToDictMixin):
 class Insight(db.Model,ToDictMixin):
     __bind_key__ = 'operational'
     __tablename__ = 'Insights'
+    __table_args__ = (
+        db.Index('ix_Insights_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UNIQUEIDENTIFIER, nullable=False)  
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
 
     files = db.relationship('File', back_populates='insight', cascade='all, delete-orphan')
@@ -70,6 +73,7 @@ class Insight(db.Model,ToDictMixin):
     customer_segments = db.relationship('CustomerSegments', back_populates='insight', cascade='all, delete-orphan')
     
     ChatMessage = db.relationship("ChatMessage", back_populates="insight", cascade="all, delete-orphan")
+    statistics = db.relationship('InsightStatistics', back_populates='insight', uselist=False, cascade='all, delete-orphan')
      
     def __repr__(self):
         return f'<Insight {self.id}>'
@@ -150,12 +154,18 @@ class Insight(db.Model,ToDictMixin):
 class ChatMessage(db.Model,ToDictMixin):
     __bind_key__ = 'operational'
     __tablename__ = 'ChatMessage'
+    __table_args__ = (
+        # Serves both the per-insight lookups and the timestamp-ordered history pages
+        db.Index('ix_ChatMessage_insight_id_timestamp_sequence', 'insight_id', 'timestamp', 'sequence'),
+    )
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
     insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
     user_message = db.Column(db.Text, nullable=False)
     bot_response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Insert order, assigned by the database; orders messages that share a timestamp
+    sequence = db.Column(db.BigInteger, db.Identity(), nullable=False)
     
     insight = db.relationship('Insight', back_populates='ChatMessage')
     
@@ -173,7 +183,7 @@ class SalesData(db.Model,ToDictMixin):
     __tablename__ = 'SalesData'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     product_line = db.Column(db.String(100), nullable=False)
     sales = db.Column(db.Numeric(18, 2), nullable=False)
 
@@ -192,7 +202,7 @@ class OrderStatus(db.Model,ToDictMixin):
     __tablename__ = 'OrderStatus'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     status_type = db.Column(db.String(50), nullable=False)
     status_count = db.Column(db.Integer, nullable=False)
 
@@ -211,7 +221,7 @@ class SalesOverTime(db.Model,ToDictMixin):
     __tablename__ = 'SalesOverTime'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     order_date = db.Column(db.Date, nullable=False)
     daily_sales = db.Column(db.Numeric(18, 2), nullable=False)
 
@@ -230,7 +240,7 @@ class QuantityPriceData(db.Model,ToDictMixin):
     __tablename__ = 'QuantityPriceData'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     quantity_ordered = db.Column(db.Integer, nullable=False)
     price_each = db.Column(db.Numeric(18, 2), nullable=False)
 
@@ -249,7 +259,7 @@ class ItemFrequency(db.Model,ToDictMixin):
     __tablename__ = 'ItemFrequency'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     item_description = db.Column(db.String(255), nullable=False)
     frequency = db.Column(db.Integer, nullable=False)
 
@@ -260,7 +270,7 @@ class MonthlySales(db.Model,ToDictMixin):
     __tablename__ = 'MonthlySales'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     date = db.Column(db.Date, nullable=False)
     count = db.Column(db.Integer, nullable=False)
 
@@ -271,7 +281,7 @@ class CustomerFrequency(db.Model,ToDictMixin):
     __tablename__ = 'CustomerFrequency'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     purchase_frequency = db.Column(db.Integer, nullable=False)
     customer_count = db.Column(db.Integer, nullable=False)
 
@@ -282,7 +292,7 @@ class CommonItemPairs(db.Model,ToDictMixin):
     __tablename__ = 'CommonItemPairs'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     item_pair = db.Column(db.String(510), nullable=False)  # 255 * 2 for two item descriptions
     pair_count = db.Column(db.Integer, nullable=False)
 
@@ -293,7 +303,7 @@ class SeasonalItems(db.Model,ToDictMixin):
     __tablename__ = 'SeasonalItems'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     month = db.Column(db.Integer, nullable=False)
     item_description = db.Column(db.String(255), nullable=False)
 
@@ -304,8 +314,80 @@ class CustomerSegments(db.Model,ToDictMixin):
     __tablename__ = 'CustomerSegments'
 
     id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
-    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, index=True)
     segment = db.Column(db.String(50), nullable=False)
     count = db.Column(db.Integer, nullable=False)
 
     insight = db.relationship('Insight', back_populates='customer_segments')
+
+class InsightStatistics(db.Model,ToDictMixin):
+    __bind_key__ = 'operational'
+    __tablename__ = 'InsightStatistics'
+
+    id = db.Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid.uuid4)
+    insight_id = db.Column(UNIQUEIDENTIFIER, db.ForeignKey('Insights.id'), nullable=False, unique=True, index=True)
+
+    # Sales over time (sales uploads)
+    sales_period_count = db.Column(db.Integer)
+    sales_total = db.Column(db.Float)
+    sales_average = db.Column(db.Float)
+    sales_peak_date = db.Column(db.Date)
+    sales_peak = db.Column(db.Float)
+    sales_low_date = db.Column(db.Date)
+    sales_low = db.Column(db.Float)
+    sales_trend_pct = db.Column(db.Float)  # first to last period
+    sales_recent_average = db.Column(db.Float)  # last 7 periods
+
+    # Quantity vs price sample (sales uploads)
+    quantity_price_sample_size = db.Column(db.Integer)
+    price_mean = db.Column(db.Float)
+    price_median = db.Column(db.Float)
+    price_p25 = db.Column(db.Float)
+    price_p75 = db.Column(db.Float)
+    quantity_mean = db.Column(db.Float)
+    quantity_median = db.Column(db.Float)
+    price_quantity_correlation = db.Column(db.Float)
+    price_elasticity = db.Column(db.Float)
+
+    # Monthly transactions (market basket uploads)
+    monthly_period_count = db.Column(db.Integer)
+    monthly_total = db.Column(db.Integer)
+    monthly_average = db.Column(db.Float)
+    monthly_peak_date = db.Column(db.Date)
+    monthly_peak = db.Column(db.Integer)
+    monthly_low_date = db.Column(db.Date)
+    monthly_low = db.Column(db.Integer)
+    monthly_growth_pct = db.Column(db.Float)
+    monthly_seasonality = db.Column(db.String(50))
+    monthly_recent_trend = db.Column(db.String(20))  # 'up', 'down' or 'fluctuating' over the last 3 months
+
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    insight = db.relationship('Insight', back_populates='statistics')
+
+class Lease(db.Model,ToDictMixin):
+    __bind_key__ = 'operational'
+    __tablename__ = 'Leases'
+
+    name = db.Column(db.String(100), primary_key=True)  # e.g. 'scheduler'
+    holder = db.Column(db.String(255), nullable=False)  # host:pid:nonce of the owning process
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class RequestTiming(db.Model,ToDictMixin):
+    __bind_key__ = 'operational'
+    __tablename__ = 'RequestTimings'
+
+    holder = db.Column(db.String(255), primary_key=True)  # host:pid of the reporting process
+    reported_at = db.Column(db.DateTime, nullable=False, index=True)
+    histogram = db.Column(db.String(1000), nullable=False)  # JSON request counts per latency bucket over the last window
+
+class InsightQuota(db.Model,ToDictMixin):
+    __bind_key__ = 'operational'
+    __tablename__ = 'InsightQuotas'
+
+    # Insights a user has created on a UTC day; incremented with conditional UPDATEs so
+    # concurrent uploads cannot take more than the plan's daily limit
+    user_id = db.Column(UNIQUEIDENTIFIER, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    used = db.Column(db.Integer, nullable=False, default=0)
@@ -2,7 +2,7 @@ from datetime import timedelta
 from flask import current_app, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from flask_login import login_user
-from app.services.auth_service import check_email_exists, get_user_subscription, process_payfast_notification, register_user, authenticate_user, get_user_by_id, reset_password, save_reset_token, update_user, verify_payfast_signature
+from app.services.auth_service import check_email_exists, get_cached_subscription, plan_claims, process_payfast_notification, register_user, authenticate_user, get_user_by_id, reset_password, save_reset_token, update_user, verify_payfast_signature
 from app.services.auth_service import AuthenticationError, UserNotFoundError, RegistrationError, UserUpdateError
 from . import auth_bp
 from logging_config import default_logger as logger
@@ -34,13 +34,13 @@ def login():
         
         user = authenticate_user(data['email'], data['password'])
         login_user(user)
-        access_token = create_access_token(identity=user.UserID, expires_delta=timedelta(days=1))
-        # Fetch subscription details
-        subscription = get_user_subscription(user.UserID)
-        if subscription:
-            subscription_dict = subscription.to_dict()
-        else:
-            subscription_dict = None;
+        # Fetch subscription details; the plan travels in the token so quota checks need no lookup
+        subscription_dict = get_cached_subscription(user.UserID)
+        access_token = create_access_token(
+            identity=user.UserID,
+            expires_delta=current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(days=1)),
+            additional_claims=plan_claims(subscription_dict)
+        )
          
         return jsonify({
             'user': user.to_dict(),
@@ -1,9 +1,17 @@
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 import logging
+from contextlib import closing
 from uuid import UUID
 
-from app.models.operational import Insight
+from sqlalchemy import func
+
+from app import db
+from app.models.operational import ChatMessage, Insight
+from app.services.chat_writer import get_chat_writer
 from app.services.chatbot_service import ChatbotService
+from app.utils.http_cache import apply_cache_headers, make_etag, is_not_modified, not_modified_response
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_page
+from app.utils.streaming import iter_keyset, stream_events, stream_items, stream_mimetype
 from . import chatbot_bp
 
 # Initialize logger
@@ -16,6 +24,16 @@ def is_valid_uuid(uuid_to_test, version=4):
         return False
     return str(uuid_obj) == uuid_to_test
 
+# Stateless: the intent matcher is compiled once at import
+chatbot_service = ChatbotService()
+
+def serialize_chat_message(msg):
+    return {
+        'user_message': msg.user_message,
+        'bot_response': msg.bot_response,
+        'timestamp': msg.timestamp.isoformat()
+    }
+
 @chatbot_bp.route('/chatbot/<uuid:insight_id>', methods=['POST'])
 def chatbot_query(insight_id):
     data = request.json
@@ -25,7 +43,6 @@ def chatbot_query(insight_id):
     if not is_valid_uuid(str(insight_id)):
         return jsonify({'error': 'Invalid insight_id'}), 400
 
-    chatbot_service = ChatbotService()
     try:
         response = chatbot_service.process_query(str(insight_id), data['query'])
         return jsonify({'response': response}), 200
@@ -33,6 +50,58 @@ def chatbot_query(insight_id):
         logger.error(f"Error processing query: {e}")
         return jsonify({'error': str(e)}), 500
 
+@chatbot_bp.route('/chatbot/<uuid:insight_id>/stream', methods=['GET', 'POST'])
+def chatbot_query_stream(insight_id):
+    # GET takes ?query= so browsers can use EventSource directly
+    if request.method == 'GET':
+        query = request.args.get('query')
+    else:
+        data = request.get_json(silent=True)
+        query = data.get('query') if data else None
+    if not isinstance(query, str) or not query.strip():
+        return jsonify({'error': 'No query provided'}), 400
+
+    if not is_valid_uuid(str(insight_id)):
+        return jsonify({'error': 'Invalid insight_id'}), 400
+
+    def events():
+        # One event per numbered section as it is computed. The message is stored after the
+        # last one; closing the reply here also stores it when the client disconnects
+        with closing(chatbot_service.process_query_stream(str(insight_id), query)) as sections:
+            for index, text in enumerate(sections):
+                yield 'section', {'index': index, 'text': text}
+        yield 'done', {}
+
+    return stream_events(events())
+
+@chatbot_bp.route('/chatbot/<uuid:insight_id>/batch', methods=['POST'])
+def chatbot_batch_query(insight_id):
+    data = request.json
+    queries = data.get('queries') if data else None
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'No queries provided'}), 400
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        return jsonify({'error': 'Queries must be non-empty strings'}), 400
+
+    max_queries = current_app.config.get('CHATBOT_BATCH_MAX_QUERIES', 20)
+    if len(queries) > max_queries:
+        return jsonify({'error': f'At most {max_queries} queries per batch'}), 400
+
+    if not is_valid_uuid(str(insight_id)):
+        return jsonify({'error': 'Invalid insight_id'}), 400
+
+    try:
+        responses = chatbot_service.process_queries(str(insight_id), queries)
+        if responses is None:
+            return jsonify({'error': 'Insight not found'}), 404
+        return jsonify({'responses': [
+            {'query': query, 'response': response} for query, response in zip(queries, responses)
+        ]}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error processing batch query: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @chatbot_bp.route('/chatbot/<uuid:insight_id>/history', methods=['GET'])
 def get_chat_history(insight_id):
     if not is_valid_uuid(str(insight_id)):
@@ -42,14 +111,73 @@ def get_chat_history(insight_id):
     if not insight:
         return jsonify({'error': 'Insight not found'}), 404
 
-    ChatMessage = insight.ChatMessage if insight.ChatMessage else []
-    chat_history = [
-        {
-            'user_message': msg.user_message,
-            'bot_response': msg.bot_response,
-            'timestamp': msg.timestamp.isoformat()
-        }
-        for msg in ChatMessage
-    ]
-
-    return jsonify({'chat_history': chat_history}), 200
\ No newline at end of file
+    # Replies are persisted in the background; make sure this insight's are in before reading
+    get_chat_writer().flush(insight.id)
+
+    if any(arg in request.args for arg in ('before', 'after', 'limit', 'tail')):
+        return get_chat_history_page(insight)
+
+    # The newest timestamp plus the message count identify the history without loading it
+    last_timestamp, message_count = db.session.query(
+        func.max(ChatMessage.timestamp),
+        func.count(ChatMessage.id)
+    ).filter(ChatMessage.insight_id == insight.id).one()
+
+    # JSON and NDJSON bodies of the same history are different representations
+    etag = make_etag(
+        'chat_history', insight.id, last_timestamp.isoformat() if last_timestamp else None, message_count, stream_mimetype()
+    )
+    if is_not_modified(etag, last_timestamp):
+        return not_modified_response(etag, last_timestamp, vary='Accept')
+
+    messages = iter_keyset(
+        ChatMessage.query.filter(ChatMessage.insight_id == insight.id),
+        ChatMessage.timestamp, ChatMessage.sequence, descending=False
+    )
+    response = stream_items(messages, serialize_chat_message, wrap_key='chat_history', endpoint='chat history')
+    return apply_cache_headers(response, etag, last_timestamp, vary='Accept'), 200
+
+def get_chat_history_page(insight):
+    # One page in chronological order. Without a cursor (or with tail=1) it is the latest
+    # `limit` messages; `before` pages back through older ones and `after` polls for newer
+    # ones. has_more refers to the direction of travel.
+    before, after = request.args.get('before'), request.args.get('after')
+    if before and after:
+        return jsonify({'error': 'Use either before or after, not both'}), 400
+    if request.args.get('tail') and (before or after):
+        return jsonify({'error': 'tail cannot be combined with a cursor'}), 400
+
+    try:
+        limit = int(request.args.get('limit', current_app.config.get('CHAT_HISTORY_PAGE_SIZE', 50)))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    limit = min(limit, current_app.config.get('CHAT_HISTORY_MAX_PAGE_SIZE', 200))
+
+    try:
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+
+    messages, has_more = keyset_page(
+        ChatMessage.query.filter(ChatMessage.insight_id == insight.id),
+        ChatMessage.timestamp, ChatMessage.sequence, limit,
+        before=before_key, after=after_key
+    )
+
+    etag = make_etag('chat_history_page', insight.id, has_more, *(
+        f"{msg.id}:{msg.timestamp.isoformat()}" for msg in messages
+    ))
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
+    response = jsonify({
+        'chat_history': [serialize_chat_message(msg) for msg in messages],
+        'has_more': has_more,
+        # An empty page keeps the caller's cursor so polling with `after` can continue
+        'before': encode_cursor(messages[0].timestamp, messages[0].sequence) if messages else before,
+        'after': encode_cursor(messages[-1].timestamp, messages[-1].sequence) if messages else after,
+    })
+    return apply_cache_headers(response, etag), 200
@@ -1,8 +1,9 @@
-from datetime import datetime
+from datetime import date, datetime
 import os
 from uuid import UUID
 from logging_config import default_logger as logger
-from sqlalchemy import Date, cast, func
+from sqlalchemy import func
+from sqlalchemy.orm import load_only, undefer
 from app.models.operational import Insight
 from app.models.archive import ArchivedInsight
 from app.services.file_service import (
@@ -11,14 +12,26 @@ from app.services.file_service import (
     FileProcessingError, DataValidationError
 )
 from . import file_bp
-from flask import Blueprint, current_app, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify, url_for
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest, NotFound, InternalServerError
-from app.services.auth_service import get_user_subscription
+from app.services.auth_service import get_plan_name
+from app.services.quota_service import get_insight_limit, reserve_insight
+from app.utils.http_cache import apply_cache_headers, insight_etag, is_not_modified, not_modified_response
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_page
+from app.utils.streaming import iter_keyset, stream_items
+from app.utils.dates import day_range
 
 ALLOWED_EXTENSIONS = {'csv'}
 
+# Archived listings are ordered by one of these, each served by a (user_id, column, id) index
+ARCHIVED_INSIGHT_SORTS = {'created_at': ArchivedInsight.created_at, 'archived_at': ArchivedInsight.archived_at}
+ARCHIVED_INSIGHT_SUMMARY_COLUMNS = (
+    ArchivedInsight.id, ArchivedInsight.user_id, ArchivedInsight.created_at, ArchivedInsight.updated_at,
+    ArchivedInsight.archived_at, ArchivedInsight.file_count, ArchivedInsight.file_types
+)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -45,27 +58,14 @@ def upload_file():
     
     try: 
         if should_create_insight:
-            print("should_create_insight")
-            subscription = get_user_subscription(current_user_id)
-            subscription_type = subscription.PlanName if subscription else None
-
-            def get_insight_limit(subscription_type):
-                if subscription_type == 'Basic':
-                    return 2
-                elif subscription_type == 'Pro':
-                    return 5
-                elif subscription_type == 'Enterprise':
-                    return 10
-                else:
-                    return 1
+            subscription_type = get_plan_name(current_user_id, get_jwt())
         
-            insight_limit = get_insight_limit(subscription)
-            today = datetime.utcnow().date()
-            insights_today = Insight.query.filter( Insight.user_id == current_user_id, cast(Insight.created_at, Date) == today).count()
-            if insights_today >= insight_limit:
+            insight_limit = get_insight_limit(subscription_type)
+            reserved_day = reserve_insight(current_user_id, insight_limit)
+            if not reserved_day:
                 raise BadRequest(f"Insight limit reached for today. Your plan allows {insight_limit} insights per day.")
             else:
-                insight = create_insight(current_user_id)
+                insight = create_insight(current_user_id, reserved_day=reserved_day)
         elif insight_id: 
             insight = Insight.query.get(insight_id)
         else: 
@@ -75,7 +75,6 @@ def upload_file():
                 insight = create_insight(current_user_id)
         
         file_results = []
-        print(insight)
         for file in files:
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
@@ -130,8 +129,13 @@ def get_insight(insight_id):
         raise NotFound("Insight not found")
     if str(insight.user_id) != str(current_user_id): 
         raise BadRequest("You don't have permission to access this insight")
- 
-    return jsonify(insight.to_dict()), 200
+
+    # Validators come from the Insights row alone, so a re-poll never touches the child tables
+    etag = insight_etag(insight)
+    if is_not_modified(etag, insight.updated_at):
+        return not_modified_response(etag, insight.updated_at)
+
+    return apply_cache_headers(jsonify(insight.to_dict()), etag, insight.updated_at), 200
 
 @file_bp.route('/insights', methods=['GET'])
 @jwt_required()
@@ -148,44 +152,131 @@ def get_insights():
 @jwt_required()
 def get_todays_insights():
     current_user_id = get_jwt_identity()
-    today = datetime.utcnow().date()
-    print("today", today)
-    insights = Insight.query.filter(
+    day_start, day_end = day_range(datetime.utcnow())
+    insight = Insight.query.filter(
         Insight.user_id == current_user_id,
-        cast(Insight.created_at, Date) == today
+        Insight.created_at >= day_start,
+        Insight.created_at < day_end
     ).order_by(Insight.created_at.desc()).first()
     
-    if not insights:
+    if not insight:
         raise NotFound("No insights found for today")
-    
-    insight = Insight.query.get(insights.id)
-     
-    return jsonify(insight.to_dict()), 200
+
+    etag = insight_etag(insight)
+    if is_not_modified(etag, insight.updated_at):
+        return not_modified_response(etag, insight.updated_at)
+
+    return apply_cache_headers(jsonify(insight.to_dict()), etag, insight.updated_at), 200
 
 @file_bp.route('/insights/previous', methods=['GET'])
 @jwt_required()
 def get_previous_insights():
     current_user_id = get_jwt_identity()
-    today = datetime.utcnow()
+    # Same rows as the old cast(created_at, Date) < utcnow() filter, which also matched today
+    _, day_end = day_range(datetime.utcnow())
     
-    insights = Insight.query.filter(
+    query = Insight.query.filter(
         Insight.user_id == current_user_id,
-        cast(Insight.created_at, Date)  < today
-    ).order_by(Insight.created_at.desc()).all()
+        Insight.created_at < day_end
+    )
     
-    return jsonify([insight.to_dict() for insight in insights]), 200
+    insights = iter_keyset(query, Insight.created_at, Insight.id)
+    return stream_items(insights, lambda insight: insight.to_dict(), endpoint='previous insights')
 
 @file_bp.route('/insights/archived', methods=['GET'])
 @jwt_required()
 def get_archived_insights():
     current_user_id = get_jwt_identity()
-    
+    query, sort_column, serialize = archived_insights_query(current_user_id)
+
+    if any(arg in request.args for arg in ('before', 'after', 'limit')):
+        return get_archived_insights_page(query, sort_column, serialize)
+
     try:
-        archived_insights = ArchivedInsight.query.filter(
-            ArchivedInsight.user_id == current_user_id, 
-        ).order_by(ArchivedInsight.created_at.desc()).all()
-          
-        return jsonify([insight.to_dict() for insight in archived_insights]), 200
+        archived_insights = iter_keyset(query, sort_column, ArchivedInsight.id)
+        return stream_items(archived_insights, serialize, endpoint='archived insights')
+    except Exception as e:
+        logger.error(f"Error fetching archived insights: {str(e)}")
+        return jsonify({'error': 'An error occurred while fetching archived insights'}), 500
+
+def _day_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a date in YYYY-MM-DD format")
+
+def archived_insights_query(user_id):
+    """
+    The user's archived insights narrowed by the request's filters, with the
+    column to order them by and the serializer for the requested view.
+
+    created_from/created_to and archived_from/archived_to are inclusive days,
+    file_type matches any file of the insight (csv or .csv), sort is created_at
+    (default) or archived_at, and view is summary or full. The summary view reads
+    only the ArchivedInsights columns, never child rows or documents.
+    """
+    sort = request.args.get('sort', 'created_at')
+    if sort not in ARCHIVED_INSIGHT_SORTS:
+        raise BadRequest(f"sort must be one of {', '.join(ARCHIVED_INSIGHT_SORTS)}")
+
+    paged = any(arg in request.args for arg in ('before', 'after', 'limit'))
+    view = request.args.get('view', 'summary' if paged else 'full')
+    if view not in ('summary', 'full'):
+        raise BadRequest("view must be summary or full")
+
+    query = ArchivedInsight.query.filter(ArchivedInsight.user_id == user_id)
+    for sort_key, column in ARCHIVED_INSIGHT_SORTS.items():
+        name = sort_key.removesuffix('_at')
+        first_day, last_day = _day_arg(f'{name}_from'), _day_arg(f'{name}_to')
+        if first_day:
+            query = query.filter(column >= day_range(first_day)[0])
+        if last_day:
+            query = query.filter(column < day_range(last_day)[1])
+
+    file_type = request.args.get('file_type', '').strip().lower()
+    if file_type:
+        query = query.filter(ArchivedInsight.file_types.contains(f",.{file_type.lstrip('.')},", autoescape=True))
+
+    if view == 'summary':
+        return query.options(load_only(*ARCHIVED_INSIGHT_SUMMARY_COLUMNS)), ARCHIVED_INSIGHT_SORTS[sort], ArchivedInsight.to_summary_dict
+    return query.options(undefer(ArchivedInsight.document)), ARCHIVED_INSIGHT_SORTS[sort], ArchivedInsight.to_dict
+
+def get_archived_insights_page(query, sort_column, serialize):
+    # One page, newest first. `before` pages back through older insights and `after`
+    # returns newer ones; has_more refers to the direction of travel
+    before, after = request.args.get('before'), request.args.get('after')
+    if before and after:
+        return jsonify({'error': 'Use either before or after, not both'}), 400
+
+    try:
+        limit = int(request.args.get('limit', current_app.config.get('ARCHIVED_INSIGHTS_PAGE_SIZE', 50)))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    limit = min(limit, current_app.config.get('ARCHIVED_INSIGHTS_MAX_PAGE_SIZE', 200))
+
+    try:
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        archived_insights, has_more = keyset_page(
+            query, sort_column, ArchivedInsight.id, limit, before=before_key, after=after_key
+        )
+        archived_insights.reverse()
+        cursor = lambda insight: encode_cursor(getattr(insight, sort_column.key), insight.id)
+        return jsonify({
+            'archived_insights': [serialize(insight) for insight in archived_insights],
+            'has_more': has_more,
+            'before': cursor(archived_insights[-1]) if archived_insights else before,
+            'after': cursor(archived_insights[0]) if archived_insights else after,
+        }), 200
     except Exception as e:
         logger.error(f"Error fetching archived insights: {str(e)}")
         return jsonify({'error': 'An error occurred while fetching archived insights'}), 500
@@ -196,27 +287,69 @@ def unarchive_insight(insight_id):
     current_user_id = get_jwt_identity()
     
     try:
-        from app.services.archive_service import unarchive_insight as unarchive_insight_service
+        from app.services.archive_service import UnarchivePermissionError, start_unarchive_job, unarchive_insight as unarchive_insight_service
+
+        # Large restores can run in the background; the client then polls the job
+        if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+            job = start_unarchive_job(insight_id, current_user_id)
+            return jsonify({
+                "message": "Unarchive started",
+                "job": job.to_dict(),
+                "status_url": url_for('file.get_unarchive_job', job_id=job.id)
+            }), 202
         
-        new_insight = unarchive_insight_service(insight_id)
+        new_insight = unarchive_insight_service(insight_id, current_user_id)
         
         if not new_insight:
             return jsonify({"error": "Failed to unarchive insight"}), 400
         
         return jsonify({"message": "Insight unarchived successfully", "new_insight_id": str(new_insight.id)}), 200
+    except UnarchivePermissionError as e:
+        return jsonify({"error": str(e)}), 403
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
         logger.error(f"Error unarchiving insight: {str(e)}")
         return jsonify({'error': 'An error occurred while unarchiving the insight'}), 500
 
+@file_bp.route('/archive/status', methods=['GET'])
+@jwt_required()
+def get_archive_status():
+    try:
+        from app.services.archive_service import get_archive_status as get_archive_status_service
+
+        status = get_archive_status_service()
+        if status is None:
+            return jsonify({"error": "No archive run recorded"}), 404
+        return jsonify(status), 200
+    except Exception as e:
+        logger.error(f"Error fetching archive status: {str(e)}")
+        return jsonify({'error': 'An error occurred while fetching the archive status'}), 500
+
+@file_bp.route('/insights/unarchive/jobs/<uuid:job_id>', methods=['GET'])
+@jwt_required()
+def get_unarchive_job(job_id):
+    current_user_id = get_jwt_identity()
+
+    try:
+        from app.services.archive_service import get_unarchive_job as get_unarchive_job_service
+
+        job = get_unarchive_job_service(job_id, current_user_id)
+        if not job:
+            return jsonify({"error": "Unarchive job not found"}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        logger.error(f"Error fetching unarchive job: {str(e)}")
+        return jsonify({'error': 'An error occurred while fetching the unarchive job'}), 500
+
 @file_bp.route('/insights/archived/<string:insight_id>', methods=['GET'])
 @jwt_required()
 def get_archived_insight(insight_id):
     current_user_id = get_jwt_identity()
     
     try:
-        archived_insight = ArchivedInsight.query.filter_by(
+        # Compact archives decode from the document fetched with the row
+        archived_insight = ArchivedInsight.query.options(undefer(ArchivedInsight.document)).filter_by(
             id=insight_id,
             user_id=current_user_id
         ).first()
@@ -0,0 +1,439 @@
+import glob
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple, Optional, Tuple
+import joblib
+import numpy as np
+import pandas as pd
+from flask import current_app
+from app.models.operational import File
+from app.services.cold_storage import open_upload
+from logging_config import default_logger as logger
+
+ADHOC_INTENT = 'filtered_query'
+
+# Fixed intents that restrict their own answer to a date range; other filters still need the raw rows
+DATE_RANGE_INTENTS = {'monthly_sales_trend', 'sales_over_time'}
+
+DATE_COLUMNS = {'sales': 'ORDERDATE', 'market_basket': 'Date'}
+
+# Columns the chatbot can filter and group by, with the words users call them
+DIMENSION_ALIASES = {
+    'PRODUCTLINE': ('product line', 'product lines', 'category', 'categories'),
+    'COUNTRY': ('country', 'countries'),
+    'CITY': ('city', 'cities'),
+    'STATE': ('state', 'states'),
+    'TERRITORY': ('territory', 'territories', 'region', 'regions'),
+    'CUSTOMERNAME': ('customer', 'customers'),
+    'STATUS': ('status', 'statuses'),
+    'DEALSIZE': ('deal size', 'deal sizes'),
+    'PRODUCTCODE': ('product code', 'product codes'),
+    'itemDescription': ('item', 'items', 'product', 'products'),
+    'Member_number': ('member', 'members', 'customer', 'customers'),
+}
+
+# Phrase -> (column, aggregation); a None column counts matching rows
+MEASURES = {
+    'sales': ('SALES', 'sum'),
+    'revenue': ('SALES', 'sum'),
+    'average price': ('PRICEEACH', 'mean'),
+    'price': ('PRICEEACH', 'mean'),
+    'quantity': ('QUANTITYORDERED', 'sum'),
+    'units': ('QUANTITYORDERED', 'sum'),
+    'orders': (None, 'count'),
+    'purchases': (None, 'count'),
+    'transactions': (None, 'count'),
+    'how many': (None, 'count'),
+    'distribution': (None, 'count'),
+}
+CURRENCY_COLUMNS = {'SALES', 'PRICEEACH'}
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'), ('dec', 'december')
+    ], 1)
+    for name in names
+}
+YEAR = r'((?:19|20)\d{2})'
+YEAR_RANGE_PATTERN = re.compile(rf'\b(?:between|from)\s+{YEAR}\s+(?:and|to|until|-)\s+{YEAR}\b')
+QUARTER_PATTERN = re.compile(rf'\bq([1-4])\s*(?:of\s+)?{YEAR}\b')
+MONTH_PATTERN = re.compile(rf"\b({'|'.join(sorted(MONTHS, key=len, reverse=True))})\.?\s+(?:of\s+)?{YEAR}\b")
+YEAR_PATTERN = re.compile(rf'\b{YEAR}\b')
+TOP_PATTERN = re.compile(r'\b(top|best|highest|bottom|worst|lowest)\b(?:\s+(\d{1,3})\b)?')
+# Wording that narrows a question down; a recognised question without any is answered by its intent
+FILTER_HINT_PATTERN = re.compile(r'\b(?:for|in|from|during|excluding|except|only|where|with)\b')
+MEASURE_PATTERN = re.compile(r'\b(' + '|'.join(re.escape(p) for p in sorted(MEASURES, key=len, reverse=True)) + r')\b')
+
+MAX_MATCHED_CATEGORIES = 5000  # higher-cardinality columns are not matched against query text
+DEFAULT_TOP_N = 5
+MAX_GROUPS = 10
+
+class QueryEntities(NamedTuple):
+    file_type: str
+    filters: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    date_range: Optional[Tuple[date, date]]
+    measure: Optional[str]
+    aggregation: str
+    group_by: Optional[str]
+    top_n: Optional[int]
+    descending: bool
+
+class ColumnarTable:
+    """
+    Dictionary-encoded, column-oriented copy of an insight's uploads of one type.
+
+    Text columns are stored as int32 codes into a list of categories, numeric
+    columns as float64 and the date column as days since the epoch, so filters
+    are integer comparisons over contiguous arrays.
+    """
+    def __init__(self, file_type, row_count, codes, categories, measures, dates):
+        self.file_type = file_type
+        self.row_count = row_count
+        self.codes = codes
+        self.categories = categories
+        self.measures = measures
+        self.dates = dates
+        self._lookup = {column: {value.lower(): code for code, value in enumerate(values)}
+                        for column, values in categories.items()}
+        self._value_matcher = None
+        self._value_columns = None
+        self._alias_matcher = None
+        self._alias_columns = None
+
+    @classmethod
+    def from_frame(cls, df, file_type):
+        date_column = DATE_COLUMNS.get(file_type)
+        codes, categories, measures = {}, {}, {}
+        for column in df.columns:
+            if column == date_column:
+                continue
+            series = df[column]
+            if column in DIMENSION_ALIASES or series.dtype == object:
+                column_codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                codes[column] = column_codes.astype(np.int32)
+                categories[column] = [str(value) for value in uniques]
+            elif pd.api.types.is_numeric_dtype(series):
+                measures[column] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        dates = None
+        if date_column in df.columns:
+            parsed = pd.to_datetime(df[date_column], errors='coerce')
+            # NaT becomes the smallest int64 and so falls outside every date range
+            dates = parsed.to_numpy(dtype='datetime64[D]').view(np.int64)
+
+        return cls(file_type, len(df), codes, categories, measures, dates)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump({
+            'file_type': self.file_type, 'row_count': self.row_count, 'codes': self.codes,
+            'categories': self.categories, 'measures': self.measures, 'dates': self.dates,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        # Arrays stay memory-mapped, so several workers share one copy in the page cache
+        data = joblib.load(path, mmap_mode='r')
+        return cls(data['file_type'], data['row_count'], data['codes'], data['categories'],
+                   data['measures'], data['dates'])
+
+    def filterable_columns(self):
+        known = [column for column in self.codes if column in DIMENSION_ALIASES]
+        columns = known or list(self.codes)
+        return [column for column in columns if len(self.categories[column]) <= MAX_MATCHED_CATEGORIES]
+
+    def match_values(self, text):
+        """Category values mentioned in `text`, as {column: {value, ...}}."""
+        if self._value_matcher is None:
+            value_columns = {}
+            for column in self.filterable_columns():
+                for value in self.categories[column]:
+                    key = value.lower()
+                    # Bare numbers would collide with years and top-N counts
+                    if len(key) >= 2 and not key.replace('.', '').isdigit():
+                        value_columns.setdefault(key, []).append(column)
+            self._value_columns = value_columns
+            alternation = '|'.join(re.escape(value) for value in sorted(value_columns, key=len, reverse=True))
+            self._value_matcher = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)') if alternation else False
+
+        matches = {}
+        if self._value_matcher:
+            for match in self._value_matcher.finditer(text):
+                for column in self._value_columns[match.group(0)]:
+                    code = self._lookup[column][match.group(0)]
+                    matches.setdefault(column, set()).add(self.categories[column][code])
+        return matches
+
+    def match_dimension(self, text):
+        if self._alias_matcher is None:
+            aliases = {alias: column for column in self.codes for alias in DIMENSION_ALIASES.get(column, ())}
+            self._alias_columns = aliases
+            alternation = '|'.join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+            self._alias_matcher = re.compile(rf'\b(?:{alternation})\b') if alternation else False
+        if not self._alias_matcher:
+            return []
+        return [self._alias_columns[match.group(0)] for match in self._alias_matcher.finditer(text)]
+
+    def mask(self, entities):
+        mask = np.ones(self.row_count, dtype=bool)
+        for column, values in entities.filters:
+            wanted = [self._lookup[column][value.lower()] for value in values]
+            column_codes = self.codes[column]
+            mask &= column_codes == wanted[0] if len(wanted) == 1 else np.isin(column_codes, wanted)
+        if entities.date_range is not None and self.dates is not None:
+            start, end = (np.datetime64(day, 'D').astype(np.int64) for day in entities.date_range)
+            mask &= (self.dates >= start) & (self.dates < end)
+        return mask
+
+    def aggregate(self, entities):
+        mask = self.mask(entities)
+        matched = int(np.count_nonzero(mask))
+        values = self.measures[entities.measure][mask] if entities.measure else None
+
+        if entities.group_by is None:
+            if entities.aggregation == 'count':
+                total = matched
+            elif entities.aggregation == 'mean':
+                total = float(np.nanmean(values)) if matched else None
+            else:
+                total = float(np.nansum(values))
+            return matched, total, None
+
+        group_codes = self.codes[entities.group_by][mask]
+        valid = group_codes >= 0
+        group_codes = group_codes[valid]
+        group_count = len(self.categories[entities.group_by])
+        counts = np.bincount(group_codes, minlength=group_count)
+        if entities.aggregation == 'count':
+            totals = counts.astype(np.float64)
+        else:
+            sums = np.bincount(group_codes, weights=np.nan_to_num(values[valid]), minlength=group_count)
+            totals = sums / np.maximum(counts, 1) if entities.aggregation == 'mean' else sums
+
+        present = np.flatnonzero(counts)
+        order = present[np.argsort(-totals[present] if entities.descending else totals[present], kind='stable')]
+        order = order[:entities.top_n or MAX_GROUPS]
+        groups = [(self.categories[entities.group_by][code], float(totals[code])) for code in order]
+        overall = float(totals[present].sum()) if entities.aggregation != 'mean' else None
+        return matched, overall, groups
+
+def extract_date_range(text):
+    match = YEAR_RANGE_PATTERN.search(text)
+    if match:
+        first, last = sorted(int(year) for year in match.groups())
+        return date(first, 1, 1), date(last + 1, 1, 1)
+
+    match = QUARTER_PATTERN.search(text)
+    if match:
+        quarter, year = int(match.group(1)), int(match.group(2))
+        start = date(year, 3 * quarter - 2, 1)
+        return start, date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+
+    match = MONTH_PATTERN.search(text)
+    if match:
+        month, year = MONTHS[match.group(1)], int(match.group(2))
+        return date(year, month, 1), date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+    years = [int(year) for year in YEAR_PATTERN.findall(text)]
+    if years:
+        return date(min(years), 1, 1), date(max(years) + 1, 1, 1)
+    return None
+
+def extract_entities(table, query):
+    text = query.lower()
+    filters = table.match_values(text)
+
+    measure, aggregation = None, 'count'
+    for match in MEASURE_PATTERN.finditer(text):
+        column, candidate = MEASURES[match.group(1)]
+        if column is None or column in table.measures:
+            measure, aggregation = column, candidate
+            break
+    else:
+        if 'SALES' in table.measures:
+            measure, aggregation = 'SALES', 'sum'
+
+    top = TOP_PATTERN.search(text)
+    group_by = next((column for column in table.match_dimension(text) if column not in filters), None)
+    top_n = None
+    if group_by is not None:
+        top_n = int(top.group(2)) if top and top.group(2) else (DEFAULT_TOP_N if top else None)
+
+    return QueryEntities(
+        file_type=table.file_type,
+        filters=tuple(sorted((column, tuple(sorted(values))) for column, values in filters.items())),
+        date_range=extract_date_range(text) if table.dates is not None else None,
+        measure=measure,
+        aggregation=aggregation,
+        group_by=group_by,
+        top_n=min(top_n, MAX_GROUPS) if top_n else None,
+        descending=not (top and top.group(1) in ('bottom', 'worst', 'lowest')),
+    )
+
+def may_need_adhoc_query(query, intent):
+    """Text-only check made before any table is loaded: could `query` need the raw rows?"""
+    if intent == 'unknown':
+        return True
+    text = query.lower()
+    return bool(YEAR_PATTERN.search(text) or FILTER_HINT_PATTERN.search(text))
+
+def is_adhoc_query(entities, intent):
+    # Fixed intents keep their answers unless the question narrows the data in a way they
+    # cannot apply; a bare "by <dimension>" only takes over questions nothing else understood
+    if entities.filters:
+        return True
+    if entities.date_range:
+        return intent not in DATE_RANGE_INTENTS
+    return entities.group_by is not None and intent == 'unknown'
+
+class _TableCache:
+    def __init__(self, max_tables):
+        self.max_tables = max_tables
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+            return table
+
+    def put(self, key, table):
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+
+_table_cache = None
+
+def _cache():
+    global _table_cache
+    if _table_cache is None:
+        _table_cache = _TableCache(current_app.config.get('COLUMNAR_CACHE_TABLES', 8))
+    return _table_cache
+
+def _read_upload(file_record):
+    with open_upload(file_record.file_path, file_record.file_hash) as upload:
+        df = pd.read_csv(upload, encoding='ISO-8859-1')
+    from app.services.file_service import identify_file_type
+    return identify_file_type(df), df
+
+def get_columnar_tables(insight_id):
+    """
+    Columnar tables for an insight's processed uploads, one per file type.
+
+    Tables are content-addressed by the uploads' hashes: they are built from the
+    CSVs once, persisted under COLUMNAR_CACHE_FOLDER and memory-mapped afterwards.
+    """
+    files = File.query.filter_by(insight_id=insight_id, status='Processed').order_by(File.upload_date).all()
+    if not files:
+        return []
+
+    digest = hashlib.sha1('|'.join(f.file_hash for f in files).encode('utf-8')).hexdigest()
+    cache_key = (str(insight_id), digest)
+    tables = _cache().get(cache_key)
+    if tables is not None:
+        return tables
+
+    folder = current_app.config['COLUMNAR_CACHE_FOLDER']
+    tables = []
+    for file_type in DATE_COLUMNS:
+        path = os.path.join(folder, f"{insight_id}-{file_type}-{digest}.joblib")
+        if os.path.exists(path):
+            tables.append(ColumnarTable.load(path))
+
+    if not tables:
+        frames = {}
+        for file_record in files:
+            try:
+                file_type, df = _read_upload(file_record)
+            except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+                logger.warning(f"Skipping {file_record.filename} for columnar cache: {str(e)}")
+                continue
+            if file_type in DATE_COLUMNS:
+                frames.setdefault(file_type, []).append(df)
+        for file_type, dfs in frames.items():
+            table = ColumnarTable.from_frame(pd.concat(dfs, ignore_index=True), file_type)
+            table.save(os.path.join(folder, f"{insight_id}-{file_type}-{digest}.joblib"))
+            tables.append(table)
+        # Tables built before the latest upload are superseded
+        for path in glob.glob(os.path.join(folder, f"{insight_id}-*.joblib")):
+            if not path.endswith(f"-{digest}.joblib"):
+                os.remove(path)
+        logger.info(f"Built columnar cache for insight {insight_id}: {sum(t.row_count for t in tables)} rows")
+
+    _cache().put(cache_key, tables)
+    return tables
+
+def resolve_adhoc_query(insight_id, query, intent):
+    """Return (table, entities) when the question should be answered from the raw upload."""
+    best = None
+    for table in get_columnar_tables(insight_id):
+        entities = extract_entities(table, query)
+        if not is_adhoc_query(entities, intent):
+            continue
+        score = len(entities.filters) + (entities.date_range is not None) + (entities.group_by is not None)
+        if best is None or score > best[0]:
+            best = (score, table, entities)
+    return (best[1], best[2]) if best else (None, None)
+
+def _label(column):
+    aliases = DIMENSION_ALIASES.get(column)
+    return aliases[0] if aliases else column
+
+def _measure_label(entities):
+    if entities.measure is None:
+        return 'Orders' if entities.file_type == 'sales' else 'Purchases'
+    label = {'SALES': 'Sales', 'QUANTITYORDERED': 'Quantity', 'PRICEEACH': 'Price'}.get(entities.measure, entities.measure)
+    return f"Average {label}" if entities.aggregation == 'mean' else f"Total {label}"
+
+def _format_value(entities, value):
+    if entities.measure in CURRENCY_COLUMNS:
+        return f"${value:,.2f}"
+    return f"{value:,.0f}" if entities.aggregation != 'mean' else f"{value:,.2f}"
+
+def _scope(entities):
+    conditions = [f"{_label(column)} = {' or '.join(values)}" for column, values in entities.filters]
+    if entities.date_range:
+        start, end = entities.date_range
+        conditions.append(f"period = {start.isoformat()} to {date.fromordinal(end.toordinal() - 1).isoformat()}")
+    return '; '.join(conditions) if conditions else 'all records'
+
+def adhoc_query_sections(table, entities):
+    scope = _scope(entities)
+    matched, total, groups = table.aggregate(entities)
+    if not matched:
+        yield f"I couldn't find any records matching {scope}."
+        return
+
+    yield "Filtered Data Analysis:\n\n"
+    yield f"Filters: {scope}\n"
+    yield f"Matching Records: {matched:,}\n"
+
+    measure_label = _measure_label(entities)
+    if groups is None:
+        yield f"\n{measure_label}: {_format_value(entities, total)}\n"
+        return
+
+    if entities.top_n:
+        direction = 'Top' if entities.descending else 'Bottom'
+        yield f"\n{direction} {len(groups)} by {_label(entities.group_by)} ({measure_label}):\n"
+    else:
+        yield f"\n{measure_label} by {_label(entities.group_by)}:\n"
+    for position, (name, value) in enumerate(groups, 1):
+        share = f" ({value / total * 100:.1f}% of total)" if total else ''
+        yield f"   {position}. {name}: {_format_value(entities, value)}{share}\n"
+
+def answer_adhoc_query(table, entities):
+    return ''.join(adhoc_query_sections(table, entities))
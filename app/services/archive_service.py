@@ -1,362 +1,750 @@
+import math
+import time
+import uuid
+import click
 from datetime import datetime, timedelta
-from sqlalchemy import Date, cast
+from sqlalchemy import bindparam, column, delete, func, insert, literal, select, table, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from flask.cli import with_appcontext
 from app import db
-from app.services.audit_service import log_audit
+from app.services.audit_service import log_audit, log_audit_bulk
+from app.services.auth_service import get_active_plans
+from app.services.cold_storage import freeze_uploads
+from app.services.leases import holds_scheduler_lease
+from app.services.request_timings import BUCKETS_MS, cluster_percentile
+from app.utils.archive_codec import DOCUMENT_VERSION, decode_document, encode_document
+from app.utils.dates import day_range
+from app.utils.pagination import keyset_filter
 from logging_config import default_logger as logger
 from app.models.archive import (
-    ArchivedChatMessage, ArchivedFile, ArchivedInsight, ArchivedOrderStatus, ArchivedQuantityPriceData, 
+    ArchiveRun, UnarchiveJob, ArchivedChatMessage, ArchivedFile, ArchivedInsight, ArchivedOrderStatus, ArchivedQuantityPriceData, 
     ArchivedSalesData, ArchivedSalesOverTime, ArchivedItemFrequency, ArchivedMonthlySales, 
     ArchivedCustomerFrequency, ArchivedCommonItemPairs, ArchivedSeasonalItems, ArchivedCustomerSegments
 )
-from app.models.operational import ChatMessage, CommonItemPairs, CustomerFrequency, CustomerSegments, File, Insight, ItemFrequency, MonthlySales, OrderStatus, QuantityPriceData, SalesData, SalesOverTime, SeasonalItems
+from app.models.operational import ChatMessage, CommonItemPairs, CustomerFrequency, CustomerSegments, File, Insight, InsightStatistics, ItemFrequency, MonthlySales, OrderStatus, QuantityPriceData, SalesData, SalesOverTime, SeasonalItems
 
-def archive_old_data():
+class ArchiveError(Exception):
+    pass
+
+class UnarchivePermissionError(Exception):
+    pass
+
+# (operational, archive) table pairs, parents first
+ARCHIVE_TABLES = [
+    (Insight, ArchivedInsight),
+    (File, ArchivedFile),
+    (SalesData, ArchivedSalesData),
+    (OrderStatus, ArchivedOrderStatus),
+    (SalesOverTime, ArchivedSalesOverTime),
+    (QuantityPriceData, ArchivedQuantityPriceData),
+    (ItemFrequency, ArchivedItemFrequency),
+    (MonthlySales, ArchivedMonthlySales),
+    (CustomerFrequency, ArchivedCustomerFrequency),
+    (CommonItemPairs, ArchivedCommonItemPairs),
+    (SeasonalItems, ArchivedSeasonalItems),
+    (CustomerSegments, ArchivedCustomerSegments),
+    (ChatMessage, ArchivedChatMessage),
+]
+
+# Operational rows with no archive table; they are derived from rows that are archived
+DISCARDED_TABLES = [InsightStatistics]
+
+# Restores run the same moves in the other direction
+UNARCHIVE_TABLES = [(archived, operational) for operational, archived in ARCHIVE_TABLES]
+
+# Tables whose rows a compact archive keeps inside the insight's document
+DOCUMENT_TABLES = ARCHIVE_TABLES[1:]
+
+# Order rows are copied in; restored ChatMessage rows get new sequence values in this order
+COPY_ORDER = {ArchivedChatMessage: ('timestamp', 'sequence')}
+
+# Longest time any other session on the instance is currently waiting for a lock, in ms
+LOCK_WAIT_QUERY = text(
+    "SELECT MAX(wait_time) FROM sys.dm_exec_requests "
+    "WHERE wait_type LIKE 'LCK%' AND session_id <> @@SPID"
+)
+
+_lock_waits_unavailable = False
+
+def _table(model, database=None):
+    """`model`'s table, or the same table in `database` on this SQL Server instance."""
+    if database is None:
+        return model.__table__
+    return table(model.__tablename__, *(column(c.name) for c in model.__table__.columns), schema=f'{database}.dbo')
+
+def _batch_key(model, model_table=None):
+    model_table = model.__table__ if model_table is None else model_table
+    return model_table.c.id if model in (Insight, ArchivedInsight) else model_table.c.insight_id
+
+def _copy_query(source, target, insight_ids, values, source_table=None):
+    """
+    Column names and the SELECT reading one batch of `source` rows shaped for
+    `target`; target columns named in `values` are set to those constants, and
+    identity columns are left for the target database to assign.
+    """
+    source_table = source.__table__ if source_table is None else source_table
+    names, columns = [], []
+    for target_column in target.__table__.columns:
+        if target_column.identity is not None:
+            continue
+        elif target_column.name in values:
+            columns.append(literal(values[target_column.name], target_column.type).label(target_column.name))
+        elif target_column.name in source_table.c:
+            columns.append(source_table.c[target_column.name])
+        else:
+            continue
+        names.append(target_column.name)
+    query = select(*columns).where(_batch_key(source, source_table).in_(insight_ids))
+    return names, query.order_by(*(source_table.c[name] for name in COPY_ORDER.get(source, ())))
+
+def _cross_database_name():
+    """
+    Name of the archive database when it lives on the same SQL Server instance as
+    the operational one, in which case a batch can be moved with INSERT...SELECT in
+    one local transaction; None otherwise.
+    """
+    if not current_app.config.get('ARCHIVE_CROSS_DATABASE_COPY', True):
+        return None
+    source, target = db.engines['operational'], db.engines['archive']
+    if source.dialect.name != 'mssql' or target.dialect.name != 'mssql':
+        return None
+    server = lambda url: (url.host, url.port, url.username, url.query.get('driver'))
+    return target.url.database if server(source.url) == server(target.url) else None
+
+def _delete_rows(connection, models, insight_ids, copied=None, database=None):
+    """Delete the batch's rows from `models` in order, checking each table against what was copied."""
+    for model in models:
+        model_table = _table(model, database)
+        deleted = connection.execute(delete(model_table).where(_batch_key(model, model_table).in_(insight_ids))).rowcount
+        expected = copied.get(model.__tablename__) if copied is not None else None
+        if expected is not None and deleted != expected:
+            raise ArchiveError(f"{model.__tablename__} changed while moving: copied {expected} rows, deleting {deleted}")
+
+def _file_summaries(files, insight_ids):
+    """ArchivedInsights listing columns for each of `insight_ids`, from its (insight_id, file_type) rows."""
+    types = {insight_id: [] for insight_id in insight_ids}
+    for insight_id, file_type in files:
+        types[insight_id].append((file_type or '').lower())
+    return {
+        insight_id: {
+            'file_count': len(file_types),
+            'file_types': f",{','.join(sorted(set(file_types)))}," if file_types else None
+        }
+        for insight_id, file_types in types.items()
+    }
+
+def _store_summaries(connection, summaries, database=None):
+    archived_insights = _table(ArchivedInsight, database)
+    connection.execute(
+        update(archived_insights)
+        .where(archived_insights.c.id == bindparam('insight_id'))
+        .values(file_count=bindparam('summary_file_count'), file_types=bindparam('summary_file_types')),
+        [
+            {'insight_id': insight_id, 'summary_file_count': summary['file_count'], 'summary_file_types': summary['file_types']}
+            for insight_id, summary in summaries.items()
+        ]
+    )
+
+def _children_first(tables, discarded=()):
+    return [*discarded, *(source for source, _ in reversed(tables))]
+
+def _move_in_server(tables, insight_ids, values, source_database=None, target_database=None, discarded=(), summaries=None):
+    # Runs on the operational connection, reaching the archive tables as <database>.dbo.<table>;
+    # copy and delete commit or roll back together
+    copied = {}
+    with db.engines['operational'].begin() as connection:
+        for source, target in tables:
+            names, query = _copy_query(source, target, insight_ids, values, _table(source, source_database))
+            statement = insert(_table(target, target_database)).from_select(names, query)
+            copied[source.__tablename__] = connection.execute(statement).rowcount
+        if summaries:
+            _store_summaries(connection, summaries, target_database)
+        _delete_rows(connection, _children_first(tables, discarded), insight_ids, copied, source_database)
+    return copied
+
+def _move_streamed(tables, insight_ids, values, chunk_size, source_bind, target_bind, discarded=(), summaries=None):
+    # Rows are read and written `chunk_size` at a time, so memory does not grow with the batch
+    copied = {}
+    with db.engines[source_bind].connect() as source_connection, db.engines[target_bind].begin() as target_connection:
+        for source, target in tables:
+            _, query = _copy_query(source, target, insight_ids, values)
+            result = source_connection.execution_options(yield_per=chunk_size).execute(query)
+            copied[source.__tablename__] = 0
+            for rows in result.mappings().partitions():
+                target_connection.execute(insert(target.__table__), [dict(row) for row in rows])
+                copied[source.__tablename__] += len(rows)
+        if summaries:
+            _store_summaries(target_connection, summaries)
+
+    # The copy is committed; only now are the originals removed
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=3)
-  
-        old_insights = Insight.query.filter(cast(Insight.created_at, Date) < cutoff_date).all()
-        
-        for insight in old_insights:
-            archived_insight = ArchivedInsight(
-                id=insight.id,
-                user_id=insight.user_id, 
-                created_at=insight.created_at,
-                updated_at=insight.updated_at, 
-            )
-            
-             # Archive files
-            for file in insight.files:
-                archived_file = ArchivedFile(
-                    id=file.id,
-                    filename=file.filename,
-                    file_path=file.file_path,
-                    file_hash=file.file_hash,
-                    user_id=file.user_id,
-                    upload_date=file.upload_date,
-                    file_size=file.file_size,
-                    file_type=file.file_type,
-                    status=file.status,
-                    insight_id=file.insight_id
-                )
-                archived_insight.files.append(archived_file)
-                log_audit('archive', 'Files', file.id, old_values=file.to_dict(), new_values=archived_file.to_dict())
-            
-            # Archive sales data
-            for sales_data in insight.sales_data:
-                archived_sales_data = ArchivedSalesData(
-                    id=sales_data.id,
-                    product_line=sales_data.product_line,
-                    sales=sales_data.sales,
-                    insight_id=sales_data.insight_id
-                )
-                archived_insight.sales_data.append(archived_sales_data)
-                log_audit('archive', 'SalesData', sales_data.id, old_values=sales_data.to_dict(), new_values=archived_sales_data.to_dict())
-            
-            # Archive order status
-            for order_status in insight.order_status:
-                archived_order_status = ArchivedOrderStatus(
-                    id=order_status.id,
-                    status_type=order_status.status_type,
-                    status_count=order_status.status_count,
-                    insight_id=order_status.insight_id
-                )
-                archived_insight.order_status.append(archived_order_status)
-                log_audit('archive', 'OrderStatus', order_status.id, old_values=order_status.to_dict(), new_values=archived_order_status.to_dict())
-            
-            # Archive sales over time
-            for sales_over_time in insight.sales_over_time:
-                archived_sales_over_time = ArchivedSalesOverTime(
-                    id=sales_over_time.id,
-                    order_date=sales_over_time.order_date,
-                    daily_sales=sales_over_time.daily_sales,
-                    insight_id=sales_over_time.insight_id
-                )
-                archived_insight.sales_over_time.append(archived_sales_over_time)
-                log_audit('archive', 'SalesOverTime', sales_over_time.id, old_values=sales_over_time.to_dict(), new_values=archived_sales_over_time.to_dict())
-            
-            # Archive quantity price data
-            for quantity_price_data in insight.quantity_price_data:
-                archived_quantity_price_data = ArchivedQuantityPriceData(
-                    id=quantity_price_data.id,
-                    quantity_ordered=quantity_price_data.quantity_ordered,
-                    price_each=quantity_price_data.price_each,
-                    insight_id=quantity_price_data.insight_id
-                )
-                archived_insight.quantity_price_data.append(archived_quantity_price_data)
-                log_audit('archive', 'QuantityPriceData', quantity_price_data.id, old_values=quantity_price_data.to_dict(), new_values=archived_quantity_price_data.to_dict())
-            
-
-            # Archive item frequencies
-            for item_frequency in insight.item_frequencies:
-                archived_item_frequency = ArchivedItemFrequency(
-                    id=item_frequency.id,
-                    item_description=item_frequency.item_description,
-                    frequency=item_frequency.frequency,
-                    insight_id=item_frequency.insight_id
-                )
-                archived_insight.item_frequencies.append(archived_item_frequency)
-                log_audit('archive', 'ItemFrequency', item_frequency.id, old_values=item_frequency.to_dict(), new_values=archived_item_frequency.to_dict())
-
-            # Archive monthly sales
-            for monthly_sale in insight.monthly_sales:
-                archived_monthly_sale = ArchivedMonthlySales(
-                    id=monthly_sale.id,
-                    date=monthly_sale.date,
-                    count=monthly_sale.count,
-                    insight_id=monthly_sale.insight_id
-                )
-                archived_insight.monthly_sales.append(archived_monthly_sale)
-                log_audit('archive', 'MonthlySales', monthly_sale.id, old_values=monthly_sale.to_dict(), new_values=archived_monthly_sale.to_dict())
-
-            # Archive customer frequencies
-            for customer_frequency in insight.customer_frequencies:
-                archived_customer_frequency = ArchivedCustomerFrequency(
-                    id=customer_frequency.id,
-                    purchase_frequency=customer_frequency.purchase_frequency,
-                    customer_count=customer_frequency.customer_count,
-                    insight_id=customer_frequency.insight_id
-                )
-                archived_insight.customer_frequencies.append(archived_customer_frequency)
-                log_audit('archive', 'CustomerFrequency', customer_frequency.id, old_values=customer_frequency.to_dict(), new_values=archived_customer_frequency.to_dict())
-
-            # Archive common item pairs
-            for common_item_pair in insight.common_item_pairs:
-                archived_common_item_pair = ArchivedCommonItemPairs(
-                    id=common_item_pair.id,
-                    item_pair=common_item_pair.item_pair,
-                    pair_count=common_item_pair.pair_count,
-                    insight_id=common_item_pair.insight_id
-                )
-                archived_insight.common_item_pairs.append(archived_common_item_pair)
-                log_audit('archive', 'CommonItemPairs', common_item_pair.id, old_values=common_item_pair.to_dict(), new_values=archived_common_item_pair.to_dict())
-
-            # Archive seasonal items
-            for seasonal_item in insight.seasonal_items:
-                archived_seasonal_item = ArchivedSeasonalItems(
-                    id=seasonal_item.id,
-                    month=seasonal_item.month,
-                    item_description=seasonal_item.item_description,
-                    insight_id=seasonal_item.insight_id
-                )
-                archived_insight.seasonal_items.append(archived_seasonal_item)
-                log_audit('archive', 'SeasonalItems', seasonal_item.id, old_values=seasonal_item.to_dict(), new_values=archived_seasonal_item.to_dict())
-
-            # Archive customer segments
-            for customer_segment in insight.customer_segments:
-                archived_customer_segment = ArchivedCustomerSegments(
-                    id=customer_segment.id,
-                    segment=customer_segment.segment,
-                    count=customer_segment.count,
-                    insight_id=customer_segment.insight_id
-                )
-                archived_insight.customer_segments.append(archived_customer_segment)
-                log_audit('archive', 'CustomerSegments', customer_segment.id, old_values=customer_segment.to_dict(), new_values=archived_customer_segment.to_dict())
-           
-            # Archive chat messages
-            for chat_message in insight.ChatMessage:
-                archived_chat_message = ArchivedChatMessage(
-                    id=chat_message.id,
-                    insight_id=chat_message.insight_id,
-                    user_message=chat_message.user_message,
-                    bot_response=chat_message.bot_response,
-                    timestamp=chat_message.timestamp
-                )
-                archived_insight.ArchivedChatMessage.append(archived_chat_message)
-                log_audit('archive', 'ChatMessage', chat_message.id, old_values=chat_message.to_dict(), new_values=archived_chat_message.to_dict())
-                
-            db.session.add(archived_insight)
-            db.session.delete(insight)
-            
-            # Log audit for the insight itself
-            log_audit('archive', 'Insights', insight.id, old_values=insight.to_dict(), new_values=archived_insight.to_dict())
-        
-        
-        db.session.commit()
-        
-        logger.info(f"Successfully archived {len(old_insights)} insights and their related data.")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error occurred during archiving process: {str(e)}")
+        with db.engines[source_bind].begin() as connection:
+            _delete_rows(connection, _children_first(tables, discarded), insight_ids, copied)
+    except Exception:
+        with db.engines[target_bind].begin() as connection:
+            _delete_rows(connection, [target for _, target in reversed(tables)], insight_ids)
         raise
+    return copied
 
+def _move_documents(insight_ids, archived_at, summaries):
+    """
+    Archive each insight of the batch as a single ArchivedInsights row whose
+    document holds all of its child rows, compressed.
+    """
+    children = {insight_id: {} for insight_id in insight_ids}
+    copied = {}
+    with db.engines['operational'].connect() as connection:
+        _, query = _copy_query(Insight, ArchivedInsight, insight_ids, {'archived_at': archived_at})
+        headers = connection.execute(query).mappings().all()
+        copied[Insight.__tablename__] = len(headers)
+        for source, target in DOCUMENT_TABLES:
+            _, query = _copy_query(source, target, insight_ids, {})
+            copied[source.__tablename__] = 0
+            for row in connection.execute(query).mappings():
+                children[row['insight_id']].setdefault(target, []).append(row)
+                copied[source.__tablename__] += 1
 
-def unarchive_insight(archived_insight_id):
+    documents = []
+    for header in headers:
+        codec, document = encode_document(children[header['id']])
+        documents.append({
+            **header, **summaries[header['id']],
+            'format_version': DOCUMENT_VERSION, 'codec': codec, 'document': document
+        })
+    if documents:
+        with db.engines['archive'].begin() as connection:
+            connection.execute(insert(ArchivedInsight.__table__), documents)
+
+    # The documents are committed; only now are the originals removed
     try:
-        archived_insight = ArchivedInsight.query.get(archived_insight_id)
-        if not archived_insight:
-            logger.error(f"Archived insight with ID {archived_insight_id} not found")
-            raise ValueError(f"Archived insight with ID {archived_insight_id} not found")
-
-        # Create a new Insight
-        new_insight = Insight(
-            id=archived_insight.id,
-            user_id=archived_insight.user_id,
-            created_at=archived_insight.created_at,
-            updated_at=datetime.utcnow(),
-          
-        )
+        with db.engines['operational'].begin() as connection:
+            _delete_rows(connection, _children_first(ARCHIVE_TABLES, DISCARDED_TABLES), insight_ids, copied)
+    except Exception:
+        with db.engines['archive'].begin() as connection:
+            _delete_rows(connection, [ArchivedInsight], insight_ids)
+        raise
+    return copied
 
-        # Unarchive files
-        for archived_file in archived_insight.files:
-            new_file = File(
-                id=archived_file.id,
-                filename=archived_file.filename,
-                file_path=archived_file.file_path,
-                file_hash=archived_file.file_hash,
-                user_id=archived_file.user_id,
-                upload_date=archived_file.upload_date,
-                file_size=archived_file.file_size,
-                file_type=archived_file.file_type,
-                status=archived_file.status,
-                insight_id=new_insight.id
-            )
-            new_insight.files.append(new_file)
-            db.session.delete(archived_file)
-            log_audit('unarchive', 'Files', new_file.id, old_values=archived_file.to_dict(), new_values=new_file.to_dict())
-
-        # Unarchive sales data
-        for archived_sales_data in archived_insight.sales_data:
-            new_sales_data = SalesData(
-                id=archived_sales_data.id,
-                product_line=archived_sales_data.product_line,
-                sales=archived_sales_data.sales,
-                insight_id=new_insight.id
-            )
-            new_insight.sales_data.append(new_sales_data)
-            db.session.delete(archived_sales_data)
-            log_audit('unarchive', 'SalesData', new_sales_data.id, old_values=archived_sales_data.to_dict(), new_values=new_sales_data.to_dict())
-
-        # Unarchive order status
-        for archived_order_status in archived_insight.order_status:
-            new_order_status = OrderStatus(
-                id=archived_order_status.id,
-                status_type=archived_order_status.status_type,
-                status_count=archived_order_status.status_count,
-                insight_id=new_insight.id
-            )
-            new_insight.order_status.append(new_order_status)
-            db.session.delete(archived_order_status)
-            log_audit('unarchive', 'OrderStatus', new_order_status.id, old_values=archived_order_status.to_dict(), new_values=new_order_status.to_dict())
-
-        # Unarchive sales over time
-        for archived_sales_over_time in archived_insight.sales_over_time:
-            new_sales_over_time = SalesOverTime(
-                id=archived_sales_over_time.id,
-                order_date=archived_sales_over_time.order_date,
-                daily_sales=archived_sales_over_time.daily_sales,
-                insight_id=new_insight.id
-            )
-            new_insight.sales_over_time.append(new_sales_over_time)
-            db.session.delete(archived_sales_over_time)
-            log_audit('unarchive', 'SalesOverTime', new_sales_over_time.id, old_values=archived_sales_over_time.to_dict(), new_values=new_sales_over_time.to_dict())
-
-        # Unarchive quantity price data
-        for archived_quantity_price_data in archived_insight.quantity_price_data:
-            new_quantity_price_data = QuantityPriceData(
-                id=archived_quantity_price_data.id,
-                quantity_ordered=archived_quantity_price_data.quantity_ordered,
-                price_each=archived_quantity_price_data.price_each,
-                insight_id=new_insight.id
-            )
-            new_insight.quantity_price_data.append(new_quantity_price_data)
-            db.session.delete(archived_quantity_price_data)
-            log_audit('unarchive', 'QuantityPriceData', new_quantity_price_data.id, old_values=archived_quantity_price_data.to_dict(), new_values=new_quantity_price_data.to_dict())
-
-        # Unarchive item frequencies
-        for archived_item_frequency in archived_insight.item_frequencies:
-            new_item_frequency = ItemFrequency(
-                id=archived_item_frequency.id,
-                item_description=archived_item_frequency.item_description,
-                frequency=archived_item_frequency.frequency,
-                insight_id=new_insight.id
-            )
-            new_insight.item_frequencies.append(new_item_frequency)
-            db.session.delete(archived_item_frequency)
-            log_audit('unarchive', 'ItemFrequency', new_item_frequency.id, old_values=archived_item_frequency.to_dict(), new_values=new_item_frequency.to_dict())
-
-        # Unarchive monthly sales
-        for archived_monthly_sales in archived_insight.monthly_sales:
-            new_monthly_sales = MonthlySales( 
-                id=archived_monthly_sales.id,
-                date=archived_monthly_sales.date,
-                count=archived_monthly_sales.count,
-                insight_id=new_insight.id
-            )
-            new_insight.monthly_sales.append(new_monthly_sales)
-            db.session.delete(archived_monthly_sales)
-            log_audit('unarchive', 'MonthlySales', new_monthly_sales.id, old_values=archived_monthly_sales.to_dict(), new_values=new_monthly_sales.to_dict())
-
-        # Unarchive customer frequencies
-        for archived_customer_frequency in archived_insight.customer_frequencies:
-            new_customer_frequency = CustomerFrequency(
-                id=archived_customer_frequency.id,
-                purchase_frequency=archived_customer_frequency.purchase_frequency,
-                customer_count=archived_customer_frequency.customer_count,
-                insight_id=new_insight.id
-            )
-            new_insight.customer_frequencies.append(new_customer_frequency)
-            db.session.delete(archived_customer_frequency)
-            log_audit('unarchive', 'CustomerFrequency', new_customer_frequency.id, old_values=archived_customer_frequency.to_dict(), new_values=new_customer_frequency.to_dict())
-
-        # Unarchive common item pairs
-        for archived_common_item_pair in archived_insight.common_item_pairs:
-            new_common_item_pair = CommonItemPairs(
-                id=archived_common_item_pair.id,
-                item_pair=archived_common_item_pair.item_pair,
-                pair_count=archived_common_item_pair.pair_count,
-                insight_id=new_insight.id
-            )
-            new_insight.common_item_pairs.append(new_common_item_pair)
-            db.session.delete(archived_common_item_pair)
-            log_audit('unarchive', 'CommonItemPairs', new_common_item_pair.id, old_values=archived_common_item_pair.to_dict(), new_values=new_common_item_pair.to_dict())
-
-        # Unarchive seasonal items
-        for archived_seasonal_item in archived_insight.seasonal_items:
-            new_seasonal_item = SeasonalItems(
-                id=archived_seasonal_item.id,
-                month=archived_seasonal_item.month,
-                item_description=archived_seasonal_item.item_description,
-                insight_id=new_insight.id
-            )
-            new_insight.seasonal_items.append(new_seasonal_item)
-            db.session.delete(archived_seasonal_item)
-            log_audit('unarchive', 'SeasonalItems', new_seasonal_item.id, old_values=archived_seasonal_item.to_dict(), new_values=new_seasonal_item.to_dict())
-
-        # Unarchive customer segments
-        for archived_customer_segment in archived_insight.customer_segments:
-            new_customer_segment = CustomerSegments(
-                id=archived_customer_segment.id,
-                segment=archived_customer_segment.segment,
-                count=archived_customer_segment.count,
-                insight_id=new_insight.id
-            )
-            new_insight.customer_segments.append(new_customer_segment)
-            db.session.delete(archived_customer_segment)
-            log_audit('unarchive', 'CustomerSegments', new_customer_segment.id, old_values=archived_customer_segment.to_dict(), new_values=new_customer_segment.to_dict())
-
-        # Unarchive chat messages
-        for archived_chat_message in archived_insight.ArchivedChatMessage:
-            new_chat_message = ChatMessage(
-                id=archived_chat_message.id,
-                insight_id=archived_chat_message.insight_id,
-                user_message=archived_chat_message.user_message,
-                bot_response=archived_chat_message.bot_response,
-                timestamp=archived_chat_message.timestamp
+def _restore_document(archived, values, database=None):
+    """Write a compact archive's rows back to the operational tables and drop its document."""
+    insight_id = archived['id']
+    decoded = decode_document(archived['codec'], archived['document'], [archived_model for archived_model, _ in UNARCHIVE_TABLES[1:]], insight_id)
+    header = {**archived, **values}
+
+    copied = {ArchivedInsight.__tablename__: 1}
+    with db.engines['operational'].begin() as connection:
+        connection.execute(insert(Insight.__table__), [{name: header[name] for name in Insight.__table__.c.keys()}])
+        for archived_model, model in UNARCHIVE_TABLES[1:]:
+            names = [column.name for column in model.__table__.columns if column.identity is None and column.name in archived_model.__table__.c]
+            order = COPY_ORDER.get(archived_model, ())
+            # Documents written before a column was added do not carry it
+            decoded_rows = sorted(decoded[archived_model], key=lambda row: tuple((row.get(name) is not None, row.get(name)) for name in order))
+            rows = [{name: row.get(name) for name in names} for row in decoded_rows]
+            if rows:
+                connection.execute(insert(model.__table__), rows)
+            copied[archived_model.__tablename__] = len(rows)
+        if database:
+            # Same instance: the document goes in the same transaction
+            _delete_rows(connection, [ArchivedInsight], [insight_id], database=database)
+            return copied
+
+    try:
+        with db.engines['archive'].begin() as connection:
+            _delete_rows(connection, [ArchivedInsight], [insight_id])
+    except Exception:
+        with db.engines['operational'].begin() as connection:
+            _delete_rows(connection, [target for _, target in reversed(UNARCHIVE_TABLES)], [insight_id])
+        raise
+    return copied
+
+def _plan_cutoffs(now):
+    """End of the cutoff day for each subscription plan; the None entry is for users without one."""
+    plan_days = {None: current_app.config.get('ARCHIVE_CUTOFF_DAYS', 3), **(current_app.config.get('ARCHIVE_PLAN_CUTOFF_DAYS') or {})}
+    return {plan: day_range(now - timedelta(days=days))[1] for plan, days in plan_days.items()}
+
+def archive_window_end(now=None):
+    """
+    When the ARCHIVE_WINDOWS window open at `now` (UTC) closes, or None while they
+    are all closed. Windows are ('HH:MM', 'HH:MM') pairs and may span midnight;
+    without any, archiving may run at any time.
+    """
+    now = now or datetime.utcnow()
+    windows = current_app.config.get('ARCHIVE_WINDOWS')
+    if not windows:
+        return datetime.max
+
+    for start, end in windows:
+        start, end = datetime.strptime(start, '%H:%M').time(), datetime.strptime(end, '%H:%M').time()
+        opened = datetime.combine(now.date(), start)
+        if end <= start and now.time() < end:
+            opened -= timedelta(days=1)
+        closes = datetime.combine(opened.date(), end) + (timedelta(days=1) if end <= start else timedelta())
+        if opened <= now < closes:
+            return closes
+    return None
+
+def _lock_wait_ms():
+    """The longest current lock wait on the operational server, or None where it cannot be read."""
+    global _lock_waits_unavailable
+    engine = db.engines['operational']
+    if engine.dialect.name != 'mssql' or _lock_waits_unavailable:
+        return None
+    try:
+        with engine.connect() as connection:
+            return connection.execute(LOCK_WAIT_QUERY).scalar() or 0
+    except SQLAlchemyError as e:
+        # Reading sys.dm_exec_requests needs VIEW SERVER STATE
+        _lock_waits_unavailable = True
+        logger.warning(f"Lock waits are unavailable, archiving will only pause on request latency: {str(e)}")
+        return None
+
+def _load_pause_reason():
+    """Why interactive traffic needs the database more than the archive does right now, if it does."""
+    latency_ms = current_app.config.get('ARCHIVE_PAUSE_LATENCY_MS')
+    if latency_ms:
+        # Across every worker: this process alone serves only its share of the traffic, or none
+        try:
+            p95 = cluster_percentile(0.95)
+        except SQLAlchemyError as e:
+            logger.warning(f"Request timings are unavailable, pausing on this process's latency only: {str(e)}")
+            timer = current_app.extensions.get('request_timer')
+            p95 = timer.percentile(0.95) if timer is not None else None
+            p95 = p95 * 1000 if p95 is not None else None
+        if p95 is not None and p95 > latency_ms:
+            return f"p95 request latency is over {BUCKETS_MS[-1]} ms" if math.isinf(p95) else f"p95 request latency is up to {p95:.0f} ms"
+
+    lock_wait_ms = current_app.config.get('ARCHIVE_PAUSE_LOCK_WAIT_MS')
+    if lock_wait_ms:
+        waited = _lock_wait_ms()
+        if waited is not None and waited > lock_wait_ms:
+            return f"a session has waited {waited} ms for a lock"
+    return None
+
+def _wait_for_quiet(deadline):
+    """Hold the run while load is over the pause thresholds; False if the window closes first."""
+    pause = current_app.config.get('ARCHIVE_PAUSE_SECONDS', 30)
+    while True:
+        reason = _load_pause_reason()
+        if reason is None:
+            return True
+        if datetime.utcnow() + timedelta(seconds=pause) >= deadline:
+            return False
+        logger.info(f"Archiving paused for {pause}s: {reason}")
+        time.sleep(pause)
+
+def _already_archived(insight_ids):
+    # insight id -> archived_at of the insights that also have an archived copy
+    with db.engines['archive'].connect() as connection:
+        return dict(connection.execute(
+            select(ArchivedInsight.id, ArchivedInsight.archived_at).where(ArchivedInsight.id.in_(insight_ids))
+        ).all())
+
+def _start_run(cutoff_end):
+    """Resume the last unfinished run from its checkpoint, or start a new one."""
+    run = (ArchiveRun.query
+           .filter(ArchiveRun.status.in_(['running', 'paused', 'failed']))
+           .order_by(ArchiveRun.started_at.desc())
+           .first())
+    if run is not None:
+        # Batches go in (created_at, id) order, so a later cutoff only adds work after the checkpoint
+        run.cutoff = max(run.cutoff, cutoff_end)
+        run.status, run.error = 'running', None
+        logger.info(f"Resuming archive run {run.id} after {run.insights_archived} insights, checkpoint insight {run.checkpoint_insight_id}")
+    else:
+        run = ArchiveRun(cutoff=cutoff_end, status='running')
+        db.session.add(run)
+
+    with db.engines['operational'].connect() as connection:
+        query = select(func.count()).select_from(Insight).where(Insight.created_at < run.cutoff)
+        if run.checkpoint:
+            query = query.where(keyset_filter(Insight.created_at, Insight.id, run.checkpoint, descending=False))
+        run.backlog = connection.execute(query).scalar()
+    db.session.commit()
+    return run
+
+def _next_batch(run, batch_size):
+    query = (select(Insight.id, Insight.user_id, Insight.created_at, Insight.updated_at)
+             .where(Insight.created_at < run.cutoff)
+             .order_by(Insight.created_at, Insight.id)
+             .limit(batch_size))
+    if run.checkpoint:
+        query = query.where(keyset_filter(Insight.created_at, Insight.id, run.checkpoint, descending=False))
+    with db.engines['operational'].connect() as connection:
+        return connection.execute(query).mappings().all()
+
+def archive_old_data(deadline=None):
+    """
+    Move insights created on or before their owner's cutoff day, with all their rows,
+    to the archive database in batches of ARCHIVE_BATCH_SIZE insights. Each batch is
+    copied and deleted table by table with set-based statements and committed on its
+    own, so a run never holds more than one batch of rows or locks.
+
+    The cutoff is ARCHIVE_CUTOFF_DAYS, or the ARCHIVE_PLAN_CUTOFF_DAYS entry for the
+    user's subscription plan. Batches are paced to ARCHIVE_MAX_ROWS_PER_SECOND and
+    held while request latency or lock waits are over their pause thresholds.
+
+    Progress is checkpointed in ArchiveRuns after every batch. A run that fails, or
+    is paused at `deadline`, is resumed from its checkpoint by the next call, and
+    insights that already reached the archive are only removed from the operational
+    database, never copied twice; those changed since they were archived are being
+    restored and are skipped. The scheduler lease is renewed before every batch,
+    and a process that has lost it stops without touching the run.
+    """
+    deadline = deadline or datetime.max
+    cutoffs = _plan_cutoffs(datetime.utcnow())
+    # Everything created on or before the latest cutoff day, as a range the created_at index
+    # can serve; insights whose plan keeps them longer are stepped over
+    cutoff_end = max(cutoffs.values())
+    latest = ArchiveRun.query.order_by(ArchiveRun.started_at.desc()).first()
+    if latest is not None and latest.status == 'completed' and latest.cutoff >= cutoff_end:
+        return 0
+
+    max_rows_per_second = current_app.config.get('ARCHIVE_MAX_ROWS_PER_SECOND')
+    batch_size = current_app.config.get('ARCHIVE_BATCH_SIZE', 100)
+    chunk_size = current_app.config.get('ARCHIVE_COPY_CHUNK_SIZE', 5000)
+    storage_format = current_app.config.get('ARCHIVE_STORAGE_FORMAT', 'document')
+    database = _cross_database_name()
+    if storage_format == 'document':
+        method = 'compact documents'
+    else:
+        method = f'INSERT...SELECT into {database}' if database else 'streamed copy'
+
+    run = _start_run(cutoff_end)
+    logger.info(f"Archive run {run.id}: {run.backlog} insights created before {run.cutoff} ({method})")
+
+    insights_archived = rows_archived = 0
+    started = time.monotonic()
+    stopped = None
+    while True:
+        if datetime.utcnow() >= deadline:
+            stopped = 'the archive window closed'
+            break
+        if not _wait_for_quiet(deadline):
+            stopped = 'load stayed over the pause thresholds until the window closed'
+            break
+        if not holds_scheduler_lease():
+            # The next leader resumes this run from its checkpoint; leave the run to it
+            db.session.rollback()
+            logger.warning(f"Archive run {run.id} stopped after {insights_archived} insights: this process lost the scheduler lease")
+            return insights_archived
+
+        candidates = _next_batch(run, batch_size)
+        if not candidates:
+            break
+        plans = get_active_plans({insight['user_id'] for insight in candidates})
+        batch = [
+            insight for insight in candidates
+            if insight['created_at'] < cutoffs.get(plans.get(insight['user_id']), cutoffs[None])
+        ]
+        if not batch:
+            run.checkpoint_created_at, run.checkpoint_insight_id = candidates[-1]['created_at'], candidates[-1]['id']
+            run.backlog = max((run.backlog or 0) - len(candidates), 0)
+            db.session.commit()
+            continue
+
+        batch_started = time.monotonic()
+        insight_ids = [insight['id'] for insight in batch]
+        archived_at = datetime.utcnow()
+        try:
+            # An insight in both databases is either one a batch interrupted between the archive
+            # commit and the operational delete, which only needs deleting, or one being restored.
+            # A restore writes the operational rows back with updated_at set to that time, after
+            # the copy's archived_at, and deletes the archived copy itself, so leave those alone
+            archived = _already_archived(insight_ids)
+            restoring = {
+                insight['id'] for insight in batch
+                if insight['id'] in archived and insight['updated_at'] and archived[insight['id']]
+                and insight['updated_at'] > archived[insight['id']]
+            }
+            if restoring:
+                logger.warning(f"Skipping {len(restoring)} insights that are being restored from the archive")
+                batch = [insight for insight in batch if insight['id'] not in restoring]
+                insight_ids = [insight['id'] for insight in batch]
+            done = set(archived) - restoring
+            if done:
+                logger.warning(f"{len(done)} insights were already archived; removing their operational rows")
+                with db.engines['operational'].begin() as connection:
+                    _delete_rows(connection, _children_first(ARCHIVE_TABLES, DISCARDED_TABLES), list(done))
+
+            pending = [insight_id for insight_id in insight_ids if insight_id not in done]
+            with db.engines['operational'].connect() as connection:
+                files = connection.execute(
+                    select(File.insight_id, File.file_type, File.file_path, File.file_hash).where(File.insight_id.in_(insight_ids))
+                ).all()
+            uploads = [(file.file_path, file.file_hash) for file in files]
+            summaries = _file_summaries(
+                [(file.insight_id, file.file_type) for file in files if file.insight_id not in done], pending
             )
-            new_insight.ChatMessage.append(new_chat_message)
-            db.session.delete(archived_chat_message)
-            log_audit('unarchive', 'ChatMessage', new_chat_message.id, old_values=archived_chat_message.to_dict(), new_values=new_chat_message.to_dict())
+            values = {'archived_at': archived_at}
+            copied = {}
+            if pending and storage_format == 'document':
+                copied = _move_documents(pending, archived_at, summaries)
+            elif pending and database:
+                copied = _move_in_server(ARCHIVE_TABLES, pending, values, target_database=database,
+                                         discarded=DISCARDED_TABLES, summaries=summaries)
+            elif pending:
+                copied = _move_streamed(ARCHIVE_TABLES, pending, values, chunk_size, 'operational', 'archive',
+                                        DISCARDED_TABLES, summaries=summaries)
+        except Exception as e:
+            db.session.rollback()
+            run.status, run.error = 'failed', str(e)
+            db.session.commit()
+            logger.error(f"Archive run {run.id} failed at batch {run.batches + 1}, checkpoint insight {run.checkpoint_insight_id}: {str(e)}")
+            raise
+
+        if current_app.config.get('COLD_STORAGE_ENABLED', True):
+            # The rows are safely archived; a failure here only leaves the raw files hot
+            try:
+                freeze_uploads(uploads)
+            except Exception as e:
+                logger.error(f"Moving archived uploads to cold storage failed: {str(e)}")
+
+        log_audit_bulk('archive', 'Insights', [
+            (insight['id'], dict(insight), {**insight, 'archived_at': archived_at})
+            for insight in batch if insight['id'] not in done
+        ])
 
-        db.session.add(new_insight)
-        db.session.delete(archived_insight)
+        insights_archived += len(batch)
+        rows_archived += sum(copied.values())
+        elapsed = time.monotonic() - started
+        run.checkpoint_created_at, run.checkpoint_insight_id = candidates[-1]['created_at'], candidates[-1]['id']
+        run.batches += 1
+        run.insights_archived += len(batch)
+        run.rows_archived += sum(copied.values())
+        run.rows_per_second = rows_archived / elapsed if elapsed else None
+        run.backlog = max((run.backlog or 0) - len(candidates), 0)
         db.session.commit()
+        logger.info(
+            f"Archive run {run.id} batch {run.batches}: {len(batch)} insights, {sum(copied.values())} rows "
+            f"in {time.monotonic() - batch_started:.2f}s; {run.rows_per_second or 0:.0f} rows/s, "
+            f"{run.backlog} insights remaining"
+        )
+
+        if max_rows_per_second:
+            spare = sum(copied.values()) / max_rows_per_second - (time.monotonic() - batch_started)
+            if spare > 0:
+                time.sleep(spare)
+
+    if stopped:
+        run.status = 'paused'
+        db.session.commit()
+        logger.info(
+            f"Archive run {run.id} paused after {insights_archived} insights because {stopped}; "
+            f"{run.backlog} insights remaining from checkpoint insight {run.checkpoint_insight_id}"
+        )
+        return insights_archived
+
+    run.status, run.backlog, run.finished_at = 'completed', 0, datetime.utcnow()
+    db.session.commit()
+    logger.info(
+        f"Successfully archived {insights_archived} insights and {rows_archived} related rows "
+        f"in {time.monotonic() - started:.1f}s."
+    )
+    return insights_archived
 
-        log_audit('unarchive', 'Insights', new_insight.id, old_values=archived_insight.to_dict(), new_values=new_insight.to_dict())
-        logger.info(f"Successfully unarchived insight with ID {archived_insight_id}")
+def get_archive_status():
+    """The most recent archive run, with its throughput and remaining backlog."""
+    run = ArchiveRun.query.order_by(ArchiveRun.started_at.desc()).first()
+    return run.to_dict() if run else None
 
-        return new_insight
 
+def _parse_insight_id(archived_insight_id):
+    try:
+        return uuid.UUID(str(archived_insight_id))
+    except ValueError:
+        raise ValueError(f"Archived insight with ID {archived_insight_id} not found")
+
+def _check_owner(archived_insight_id, user_id):
+    """The archived insight's id, once it is known to exist and belong to `user_id`."""
+    insight_id = _parse_insight_id(archived_insight_id)
+    owner = db.session.query(ArchivedInsight.user_id).filter(ArchivedInsight.id == insight_id).first()
+    if owner is None:
+        raise ValueError(f"Archived insight with ID {archived_insight_id} not found")
+    if str(owner.user_id) != str(user_id):
+        raise UnarchivePermissionError("You don't have permission to unarchive this insight")
+    return insight_id
+
+def _unarchive(archived_insight_id):
+    """Move one archived insight and all its rows back to the operational database; returns (id, rows)."""
+    insight_id = _parse_insight_id(archived_insight_id)
+    with db.engines['archive'].connect() as connection:
+        archived = connection.execute(
+            select(ArchivedInsight.__table__).where(ArchivedInsight.id == insight_id)
+        ).mappings().first()
+    if not archived:
+        logger.error(f"Archived insight with ID {archived_insight_id} not found")
+        raise ValueError(f"Archived insight with ID {archived_insight_id} not found")
+
+    started = time.monotonic()
+    values = {'updated_at': datetime.utcnow()}
+    database = _cross_database_name()
+    try:
+        if archived['format_version'] is not None:
+            copied = _restore_document(archived, values, database)
+        elif database:
+            copied = _move_in_server(UNARCHIVE_TABLES, [insight_id], values, source_database=database)
+        else:
+            chunk_size = current_app.config.get('ARCHIVE_COPY_CHUNK_SIZE', 5000)
+            copied = _move_streamed(UNARCHIVE_TABLES, [insight_id], values, chunk_size, 'archive', 'operational')
     except Exception as e:
-        db.session.rollback()
         logger.error(f"Error occurred during unarchiving process: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+    rows = sum(copied.values())
+    header = {key: archived[key] for key in ArchivedInsight.__table__.c.keys() if key != 'document'}
+    restored = {key: header[key] for key in Insight.__table__.c.keys()}
+    log_audit('unarchive', 'Insights', insight_id, old_values=header, new_values={**restored, **values},
+              additional_info={'rows_restored': rows})
+    logger.info(f"Successfully unarchived insight with ID {archived_insight_id}: {rows} rows in {time.monotonic() - started:.2f}s")
+    return insight_id, rows
+
+def unarchive_insight(archived_insight_id, user_id):
+    insight_id, _ = _unarchive(_check_owner(archived_insight_id, user_id))
+    return Insight.query.get(insight_id)
+
+def _run_unarchive_job(app, job_id):
+    with app.app_context():
+        job = UnarchiveJob.query.get(job_id)
+        job.status, job.started_at = 'running', datetime.utcnow()
+        db.session.commit()
+        try:
+            _, job.rows_restored = _unarchive(job.insight_id)
+            job.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            job.status, job.error = 'failed', str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def start_unarchive_job(archived_insight_id, user_id):
+    """Queue a restore on this process's scheduler and return its UnarchiveJob at once."""
+    insight_id = _check_owner(archived_insight_id, user_id)
+
+    job = UnarchiveJob(insight_id=insight_id, user_id=user_id, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    current_app.apscheduler.add_job(
+        f'unarchive-{job.id}', _run_unarchive_job, args=[current_app._get_current_object(), job.id]
+    )
+    logger.info(f"Queued unarchive job {job.id} for insight {archived_insight_id}")
+    return job
+
+def get_unarchive_job(job_id, user_id):
+    return UnarchiveJob.query.filter_by(id=job_id, user_id=user_id).first()
+
+def recover_unarchive_jobs(app):
+    """
+    Settle unarchive jobs left behind by processes that stopped before finishing
+    them. Jobs still queued after UNARCHIVE_JOB_STALE_MINUTES are run here; jobs
+    running that long are marked completed if their insight is back in the
+    operational database, failed otherwise. Each job is claimed with a conditional
+    UPDATE, so when every process recovers at startup only one of them acts on it.
+    """
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(minutes=app.config.get('UNARCHIVE_JOB_STALE_MINUTES', 30))
+        jobs = UnarchiveJob.__table__
+        try:
+            with db.engines['archive'].connect() as connection:
+                stale = connection.execute(
+                    select(jobs.c.id, jobs.c.insight_id, jobs.c.status).where(
+                        (jobs.c.status == 'queued') & (jobs.c.created_at < cutoff)
+                        | (jobs.c.status == 'running') & (jobs.c.started_at < cutoff)
+                    )
+                ).all()
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not look for interrupted unarchive jobs: {str(e)}")
+            return
+
+        for job_id, insight_id, status in stale:
+            if status == 'queued':
+                claimed = update(jobs).where(jobs.c.id == job_id, jobs.c.status == 'queued').values(status='running', started_at=datetime.utcnow())
+            else:
+                restored = (db.session.query(Insight.id).filter(Insight.id == insight_id).first() is not None
+                            and db.session.query(ArchivedInsight.id).filter(ArchivedInsight.id == insight_id).first() is None)
+                claimed = update(jobs).where(jobs.c.id == job_id, jobs.c.status == 'running', jobs.c.started_at < cutoff).values(
+                    status='completed' if restored else 'failed', finished_at=datetime.utcnow(),
+                    error=None if restored else 'Interrupted before it finished; start the restore again'
+                )
+            with db.engines['archive'].begin() as connection:
+                if not connection.execute(claimed).rowcount:
+                    continue  # another process settled it first
+            logger.warning(f"Recovered {status} unarchive job {job_id} for insight {insight_id}")
+            if status == 'queued':
+                _run_unarchive_job(app, job_id)
+
+@click.command('compact-archive')
+@click.option('--batch-size', default=100, show_default=True, help='Archived insights converted per transaction.')
+@with_appcontext
+def compact_archive_command(batch_size):
+    """Convert insights archived row by row into compact archive documents."""
+    archived_tables = [target for _, target in DOCUMENT_TABLES]
+    converted = rows = 0
+    while True:
+        # Each batch is rewritten and its Archived* rows deleted in one transaction
+        with db.engines['archive'].begin() as connection:
+            insight_ids = connection.execute(
+                select(ArchivedInsight.id)
+                .where(ArchivedInsight.format_version.is_(None))
+                .order_by(ArchivedInsight.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not insight_ids:
+                break
+
+            children = {insight_id: {} for insight_id in insight_ids}
+            for model in archived_tables:
+                for row in connection.execute(select(model.__table__).where(_batch_key(model).in_(insight_ids))).mappings():
+                    children[row['insight_id']].setdefault(model, []).append(row)
+                    rows += 1
+
+            archived_insights = ArchivedInsight.__table__
+            _store_summaries(connection, _file_summaries(
+                [(file['insight_id'], file['file_type']) for insight_id in insight_ids for file in children[insight_id].get(ArchivedFile, [])],
+                insight_ids
+            ))
+            for insight_id in insight_ids:
+                codec, document = encode_document(children[insight_id])
+                connection.execute(
+                    update(archived_insights)
+                    .where(archived_insights.c.id == insight_id)
+                    .values(format_version=DOCUMENT_VERSION, codec=codec, document=document)
+                )
+            _delete_rows(connection, archived_tables[::-1], insight_ids)
+
+        converted += len(insight_ids)
+        click.echo(f"Converted {converted} archived insights ({rows} rows)")
+
+    click.echo(f"Done: {converted} archived insights converted to compact documents")
+
+@click.command('summarize-archive')
+@click.option('--batch-size', default=500, show_default=True, help='Archived insights summarized per transaction.')
+@with_appcontext
+def summarize_archive_command(batch_size):
+    """Fill the listing summary of insights archived before it was recorded."""
+    summarized = 0
+    while True:
+        with db.engines['archive'].begin() as connection:
+            archived = connection.execute(
+                select(ArchivedInsight.id, ArchivedInsight.format_version, ArchivedInsight.codec, ArchivedInsight.document)
+                .where(ArchivedInsight.file_count.is_(None))
+                .order_by(ArchivedInsight.id)
+                .limit(batch_size)
+            ).all()
+            if not archived:
+                break
+
+            insight_ids = [insight.id for insight in archived]
+            files = list(connection.execute(
+                select(ArchivedFile.insight_id, ArchivedFile.file_type).where(ArchivedFile.insight_id.in_(insight_ids))
+            ).tuples())
+            for insight in archived:
+                if insight.format_version is not None:
+                    decoded = decode_document(insight.codec, insight.document, [ArchivedFile], insight.id)
+                    files.extend((insight.id, file['file_type']) for file in decoded[ArchivedFile])
+            _store_summaries(connection, _file_summaries(files, insight_ids))
+
+        summarized += len(archived)
+        click.echo(f"Summarized {summarized} archived insights")
+
+    click.echo(f"Done: {summarized} archived insights summarized")
@@ -1,7 +1,9 @@
 import json
+import uuid
 from uuid import UUID
 from datetime import date, datetime
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert
 from app import db
 from flask import current_app, has_request_context
 from flask_login import current_user
@@ -20,7 +22,7 @@ def serialize_dict(d):
         return None
     return json.dumps(d, default=json_serializer)
 
-def log_audit(action, table_name, record_id, old_values=None, new_values=None, additional_info=None):
+def _audit_user_id():
     try:
         if has_request_context():
             user_id = get_jwt_identity()
@@ -28,9 +30,11 @@ def log_audit(action, table_name, record_id, old_values=None, new_values=None, a
             user_id = None  # or any identifier you want to use for system actions
     except Exception:
         user_id = None  # Fallback if JWT is not available
-   
+    return str(user_id) if user_id else None
+
+def log_audit(action, table_name, record_id, old_values=None, new_values=None, additional_info=None):
     audit_entry = AuditEntry(
-        user_id=str(user_id) if user_id else None,
+        user_id=_audit_user_id(),
         action=action,
         table_name=table_name,
         record_id=str(record_id),
@@ -45,4 +49,32 @@ def log_audit(action, table_name, record_id, old_values=None, new_values=None, a
         logger.info(f"Audit log created: {audit_entry}")
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Failed to create audit log: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to create audit log: {str(e)}")
+
+def log_audit_bulk(action, table_name, records, additional_info=None):
+    """Write one audit entry per (record_id, old_values, new_values) in a single statement and commit."""
+    user_id = _audit_user_id()
+    entries = [
+        {
+            'id': uuid.uuid4(),
+            'timestamp': datetime.utcnow(),
+            'user_id': user_id,
+            'action': action,
+            'table_name': table_name,
+            'record_id': str(record_id),
+            'old_values': serialize_dict(old_values),
+            'new_values': serialize_dict(new_values),
+            'additional_info': serialize_dict(additional_info)
+        }
+        for record_id, old_values, new_values in records
+    ]
+    if not entries:
+        return
+
+    try:
+        db.session.execute(insert(AuditEntry), entries)
+        db.session.commit()
+        logger.info(f"Audit log created: {len(entries)} {action} entries on {table_name}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to create audit log: {str(e)}")
@@ -1,7 +1,7 @@
 import hashlib
-from operator import and_
+import threading
+import time
 
-from sqlalchemy import Date, cast
 from app import db, bcrypt
 from app.models.auth import Subscription, Token, User, Role, UserRole
 from uuid import uuid4
@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import jwt
 from flask import current_app
 from app.services.audit_service import log_audit
+from app.utils.caching import TTLCache
+from app.utils.dates import day_range
 from logging_config import default_logger as logger
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -131,6 +133,8 @@ def process_payfast_notification(payment_data):
 
             db.session.add(subscription)
             db.session.commit()
+            invalidate_subscription(user.UserID)
+            _plan_changes().record(user.UserID, subscription.LastPaymentDate)
 
             logger.info(f"Subscription updated for user: {user_email}")
             # Log audit for subscription update
@@ -170,32 +174,26 @@ def verify_payfast_signature(payload, received_signature):
  
 def get_user_subscription(user_id):
     try:
-        current_date = datetime.utcnow()
-        subscription = Subscription.query.filter(
-            and_(
-                and_(
-                    Subscription.UserID == user_id,
-                    Subscription.Status == 'Active',
-                ),
-                    and_(cast(Subscription.StartDate, Date)  <= current_date,
-                    cast(Subscription.EndDate, Date)    >= current_date
-                )
-            )
-        ).first()
-        
+        _, day_end = day_range(datetime.utcnow())
+        # One read of the user's active subscriptions by the UserID index, instead of two
+        # queries filtering on cast(StartDate, Date) and cast(EndDate, Date). A subscription
+        # runs from the start of its StartDate day until the start of its EndDate day.
+        subscriptions = Subscription.query.filter(
+            Subscription.UserID == user_id,
+            Subscription.Status == 'Active'
+        ).all()
+
+        subscription = next((
+            subscription for subscription in subscriptions
+            if subscription.StartDate < day_end and subscription.EndDate >= day_end
+        ), None)
         if subscription:
             return subscription
         else:
             # Check if there's an expired subscription that needs status update
-            expired_subscription = Subscription.query.filter(
-                and_(
-                    and_(
-                        Subscription.UserID == user_id,
-                        Subscription.Status == 'Active',
-                    ),
-                    cast(Subscription.EndDate, Date)  < current_date
-                )
-            ).first()
+            expired_subscription = next((
+                subscription for subscription in subscriptions if subscription.EndDate < day_end
+            ), None)
             
             if expired_subscription:
                 expired_subscription.Status = 'Expired'
@@ -205,6 +203,166 @@ def get_user_subscription(user_id):
     except Exception as e:
         logger.error(f"Error fetching user subscription: {str(e)}")
         return None
+
+_NOT_CACHED = object()
+_subscription_cache = None
+
+def _subscriptions():
+    global _subscription_cache
+    if _subscription_cache is None:
+        _subscription_cache = TTLCache(
+            current_app.config.get('SUBSCRIPTION_CACHE_SIZE', 10000),
+            current_app.config.get('SUBSCRIPTION_CACHE_TTL', 300)
+        )
+    return _subscription_cache
+
+def get_cached_subscription(user_id):
+    """
+    The user's active subscription as a dict (Subscription.to_dict()), or None,
+    from a per-process cache. Entries live SUBSCRIPTION_CACHE_TTL seconds at most
+    and never past the subscription's last day.
+    """
+    cache = _subscriptions()
+    key = str(user_id)
+    subscription = cache.get(key, _NOT_CACHED)
+    if subscription is not _NOT_CACHED:
+        return subscription
+
+    subscription = get_user_subscription(user_id)
+    if subscription is None:
+        cache.put(key, None)
+        return None
+    lapses, _ = day_range(subscription.EndDate)
+    subscription = subscription.to_dict()
+    cache.put(key, subscription, ttl=(lapses - datetime.utcnow()).total_seconds())
+    return subscription
+
+def invalidate_subscription(user_id):
+    _subscriptions().pop(str(user_id))
+
+def _drop_outdated_subscription(user_id, version):
+    # A change made by another worker: this worker's cached copy would otherwise keep
+    # the old plan until its TTL ran out
+    cache = _subscriptions()
+    cached = cache.get(str(user_id), _NOT_CACHED)
+    if cached is _NOT_CACHED:
+        return
+    if cached is None or cached['lastPaymentDate'] is None or datetime.fromisoformat(cached['lastPaymentDate']) < version:
+        cache.pop(str(user_id))
+
+class PlanChangeFeed:
+    """
+    Version (LastPaymentDate) of every subscription changed within the lifetime
+    of an access token, so plan claims can be checked without a query per request.
+    Each worker's scheduler reads new changes with one incremental query every
+    PLAN_CHANGE_POLL_SECONDS and drops cached subscriptions they make outdated; a
+    change made by this worker is seen at once. Should the scheduler stall, the
+    next lookup polls instead, so claims are never trusted on a view gone stale.
+    """
+    # Re-read this much before the newest change seen, for transactions that committed late
+    OVERLAP = timedelta(minutes=1)
+
+    def __init__(self, poll_seconds, horizon):
+        self.poll_seconds = poll_seconds
+        self.horizon = horizon
+        self._versions = {}
+        self._watermark = datetime.utcnow() - horizon
+        self._polled_at = None
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        with self._lock:
+            stalled = self._polled_at is None or time.monotonic() - self._polled_at >= 3 * self.poll_seconds
+        if stalled:
+            self.poll()
+        with self._lock:
+            version = self._versions.get(str(user_id))
+        return version.isoformat() if version else None
+
+    def record(self, user_id, version):
+        with self._lock:
+            self._versions[str(user_id)] = max(version, self._versions.get(str(user_id), version))
+
+    def poll(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._polled_at is not None and now - self._polled_at < self.poll_seconds / 2:
+                return  # the scheduler and a stalled-feed lookup raced; one query is enough
+            self._polled_at = now
+            since = self._watermark - self.OVERLAP
+
+        changes = db.session.query(Subscription.UserID, Subscription.LastPaymentDate).filter(
+            Subscription.LastPaymentDate > since
+        ).all()
+        for user_id, version in changes:
+            self.record(user_id, version)
+            _drop_outdated_subscription(user_id, version)
+
+        with self._lock:
+            if changes:
+                self._watermark = max(self._watermark, *(version for _, version in changes))
+            # Tokens issued before an older change have expired since
+            oldest = datetime.utcnow() - self.horizon
+            self._versions = {user_id: version for user_id, version in self._versions.items() if version >= oldest}
+
+_plan_change_feed = None
+
+def _plan_changes():
+    global _plan_change_feed
+    if _plan_change_feed is None:
+        _plan_change_feed = PlanChangeFeed(
+            current_app.config.get('PLAN_CHANGE_POLL_SECONDS', 30),
+            current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(days=1))
+        )
+    return _plan_change_feed
+
+def refresh_plan_changes(app):
+    """Scheduled in every worker: read the subscription changes made since the last poll."""
+    with app.app_context():
+        try:
+            _plan_changes().poll()
+        except Exception as e:
+            logger.warning(f"Could not read subscription changes: {str(e)}")
+
+def plan_claims(subscription):
+    """Access token claims for `subscription` (a Subscription.to_dict(), or None)."""
+    if subscription is None:
+        return {'plan': None, 'plan_expires': None, 'plan_version': None}
+    lapses, _ = day_range(datetime.fromisoformat(subscription['endDate']))
+    return {
+        'plan': subscription['planName'],
+        'plan_expires': lapses.isoformat(),
+        'plan_version': subscription['lastPaymentDate']
+    }
+
+def get_plan_name(user_id, claims=None):
+    """
+    The user's current plan name, or None. The access token's plan claims are
+    trusted while the plan has not lapsed and no later change to the subscription
+    is known; otherwise, and for tokens without plan claims, it is looked up.
+    """
+    if claims and 'plan_version' in claims:
+        expires = claims['plan_expires']
+        current = expires is None or datetime.utcnow() < datetime.fromisoformat(expires)
+        changed = _plan_changes().version(user_id)
+        if current and (changed is None or changed == claims['plan_version']):
+            return claims['plan']
+
+    subscription = get_cached_subscription(user_id)
+    return subscription['planName'] if subscription else None
+
+def get_active_plans(user_ids):
+    """PlanName of the active subscription of each of `user_ids` that has one, in one query."""
+    if not user_ids:
+        return {}
+    _, day_end = day_range(datetime.utcnow())
+    rows = db.session.query(Subscription.UserID, Subscription.PlanName).filter(
+        Subscription.UserID.in_(list(user_ids)),
+        Subscription.Status == 'Active',
+        Subscription.StartDate < day_end,
+        Subscription.EndDate >= day_end
+    ).all()
+    return {user_id: plan_name for user_id, plan_name in rows}
     
 def check_email_exists(email):
     """
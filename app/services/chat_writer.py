@@ -0,0 +1,261 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models.operational import ChatMessage, Insight
+from logging_config import default_logger as logger
+
+class ChatMessageWriter:
+    """
+    Write-behind queue for ChatMessage rows.
+
+    Chat replies are returned as soon as they are generated; a single background
+    thread per process inserts the queued rows in small batches. One FIFO and one
+    writer keep each insight's messages in insert order, which the database records
+    in ChatMessage.sequence. Readers call flush() first so a history request always
+    sees the messages this process has accepted.
+
+    A batch that fails to write goes back to the head of the queue and is retried
+    with backoff. After CHAT_WRITE_MAX_ATTEMPTS failures its rows are written one
+    at a time, so a row that can never be written does not hold up the rest: rows
+    of insights that no longer exist are dropped and other failing rows are moved
+    to CHAT_WRITE_DEAD_LETTER_FOLDER. Whatever is still queued at interpreter exit
+    is spilled to CHAT_WRITE_SPILL_FOLDER, and the next writer to start loads it back.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.enabled = app.config.get('CHAT_WRITE_BEHIND_ENABLED', True)
+        self.batch_size = app.config.get('CHAT_WRITE_BATCH_SIZE', 50)
+        self.flush_interval = app.config.get('CHAT_WRITE_FLUSH_INTERVAL', 0.2)
+        self.flush_timeout = app.config.get('CHAT_WRITE_FLUSH_TIMEOUT', 5)
+        self.max_backoff = app.config.get('CHAT_WRITE_MAX_BACKOFF', 30)
+        self.max_attempts = app.config.get('CHAT_WRITE_MAX_ATTEMPTS', 3)
+        self.spill_folder = app.config.get('CHAT_WRITE_SPILL_FOLDER')
+        self.dead_letter_folder = app.config.get('CHAT_WRITE_DEAD_LETTER_FOLDER')
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._queue = deque()
+        self._pending = defaultdict(int)  # insight_id -> rows queued or being written
+        self._condition = threading.Condition()
+        self._flush_requested = False
+        self._stopping = False
+        self._failures = 0  # consecutive failed writes
+        self._thread = None
+        self._recovered = False
+        self._pid = os.getpid()
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork; a forked worker starts with an empty queue of its own
+        if self._pid != os.getpid():
+            self._reset()
+        if not self._recovered:
+            self._recovered = True
+            self._load_spilled()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='chat-message-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, insight_id, exchanges):
+        """Queue (user_message, bot_response) pairs for one insight, in the order given."""
+        # All rows carry the time they were accepted; sequence orders the ones that share it
+        timestamp = datetime.utcnow()
+        rows = [
+            {
+                'id': uuid.uuid4(), 'insight_id': insight_id,
+                'user_message': user_message, 'bot_response': bot_response,
+                'timestamp': timestamp
+            }
+            for user_message, bot_response in exchanges
+        ]
+        if not rows:
+            return
+
+        if not self.enabled:
+            db.session.execute(insert(ChatMessage), rows)
+            db.session.commit()
+            return
+
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("Chat message writer is shut down")
+            self._ensure_worker()
+            self._queue.extend(rows)
+            self._pending[insight_id] += len(rows)
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self, insight_id=None, timeout=None):
+        """Wait until queued messages (of one insight, or all) are committed."""
+        if not self.enabled:
+            return True
+
+        def flushed():
+            return not self._pending.get(insight_id) if insight_id is not None else not self._pending
+
+        with self._condition:
+            self._ensure_worker()
+            if flushed():
+                return True
+            self._flush_requested = True
+            self._condition.notify_all()
+            done = self._condition.wait_for(flushed, timeout or self.flush_timeout)
+        if not done:
+            logger.warning(f"Timed out flushing chat messages for insight {insight_id}")
+        return done
+
+    def close(self):
+        with self._condition:
+            if self._pid != os.getpid() or self._thread is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(self.flush_timeout)
+        with self._condition:
+            if self._queue:
+                self._spill(list(self._queue))
+                self._queue.clear()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopping or self._flush_requested or len(self._queue) >= self.batch_size,
+                    self.flush_interval
+                )
+                if not self._queue:
+                    self._flush_requested = False
+                    if self._stopping:
+                        return
+                    continue
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+            retry = [] if self._write(batch) else batch
+            if retry and self._failures + 1 >= self.max_attempts:
+                retry = self._write_each(batch)
+
+            with self._condition:
+                for row in batch[:len(batch) - len(retry)]:
+                    self._pending[row['insight_id']] -= 1
+                    if not self._pending[row['insight_id']]:
+                        del self._pending[row['insight_id']]
+                if retry:
+                    # Keep the rest at the head of the queue so the insight's order holds
+                    self._queue.extendleft(reversed(retry))
+                    self._failures += 1
+                    self._condition.notify_all()
+                    if self._stopping:
+                        return
+                    self._condition.wait_for(lambda: self._stopping, min(0.5 * 2 ** (self._failures - 1), self.max_backoff))
+                    continue
+                self._failures = 0
+                if not self._queue:
+                    self._flush_requested = False
+                self._condition.notify_all()
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(ChatMessage), batch)
+                db.session.commit()
+                return True
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Writing {len(batch)} chat messages failed (attempt {self._failures + 1}): {str(e)}")
+                return False
+
+    def _write_each(self, batch):
+        """
+        Write the rows of a batch that keeps failing one at a time. Returns the rows
+        still to retry: those from the first one whose failure could not be told
+        apart from the database being unavailable.
+        """
+        dead = []
+        try:
+            with self.app.app_context():
+                for index, row in enumerate(batch):
+                    try:
+                        db.session.execute(insert(ChatMessage), [row])
+                        db.session.commit()
+                        continue
+                    except Exception as e:
+                        db.session.rollback()
+                        error = e
+
+                    try:
+                        exists = db.session.query(Insight.id).filter(Insight.id == row['insight_id']).first() is not None
+                    except Exception:
+                        db.session.rollback()
+                        return batch[index:]
+
+                    if not exists:
+                        logger.warning(f"Dropped chat message {row['id']}: insight {row['insight_id']} no longer exists")
+                    else:
+                        logger.error(f"Chat message {row['id']} of insight {row['insight_id']} cannot be written: {str(error)}")
+                        dead.append(row)
+                return []
+        finally:
+            if dead:
+                self._dump(dead, self.dead_letter_folder, 'failed to write')
+
+    def _dump(self, rows, folder, reason):
+        # Rows are saved as JSON, one file per call; returns whether they were saved
+        if not folder:
+            logger.error(f"{len(rows)} chat messages {reason} were discarded")
+            return False
+        path = os.path.join(folder, f'{os.getpid()}-{uuid.uuid4().hex}.json')
+        try:
+            os.makedirs(folder, exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump([
+                    {**row, 'id': str(row['id']), 'insight_id': str(row['insight_id']), 'timestamp': row['timestamp'].isoformat()}
+                    for row in rows
+                ], f)
+            os.replace(path + '.tmp', path)
+            logger.warning(f"Saved {len(rows)} chat messages {reason} to {path}")
+            return True
+        except OSError as e:
+            logger.error(f"{len(rows)} chat messages {reason} could not be saved: {str(e)}")
+            return False
+
+    def _spill(self, rows):
+        self._dump(rows, self.spill_folder, 'not written before shutdown')
+
+    def _load_spilled(self):
+        # Runs under the condition; renaming a file claims it, so only one worker loads it
+        if not self.spill_folder:
+            return
+        rows = []
+        for path in sorted(glob.glob(os.path.join(self.spill_folder, '*.json')), key=os.path.getmtime):
+            claimed = f'{path}.{os.getpid()}.loading'
+            try:
+                os.rename(path, claimed)
+                with open(claimed, encoding='utf-8') as f:
+                    spilled = json.load(f)
+                os.remove(claimed)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load spilled chat messages from {path}: {str(e)}")
+                continue
+            rows.extend(
+                {**row, 'id': uuid.UUID(row['id']), 'insight_id': uuid.UUID(row['insight_id']), 'timestamp': datetime.fromisoformat(row['timestamp'])}
+                for row in spilled
+            )
+        if rows:
+            logger.info(f"Queued {len(rows)} chat messages spilled by an earlier writer")
+            self._queue.extendleft(reversed(rows))
+            for row in rows:
+                self._pending[row['insight_id']] += 1
+
+def init_chat_writer(app):
+    app.extensions['chat_writer'] = ChatMessageWriter(app)
+
+def get_chat_writer():
+    return current_app.extensions['chat_writer']
@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.operational import File
+from logging_config import default_logger as logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+EXTENSIONS = ('.csv.zst', '.csv.gz')
+
+def cold_path(file_hash, extension):
+    # Content-addressed by SHA-256, fanned out over two directory levels
+    folder = current_app.config['COLD_STORAGE_FOLDER']
+    return os.path.join(folder, file_hash[:2], file_hash[2:4], file_hash + extension)
+
+def find_cold_copy(file_hash):
+    for extension in EXTENSIONS:
+        path = cold_path(file_hash, extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+def freeze_upload(file_path, file_hash):
+    """
+    Make sure a compressed copy of the upload exists in the cold tier. Returns True
+    when the hot file holds exactly the recorded content and may be deleted.
+    """
+    if not os.path.exists(file_path):
+        return False
+
+    existing = find_cold_copy(file_hash)
+    if existing:
+        os.utime(existing)  # retention age counts from the latest archive that needed it
+        # Imported here because file_service reads uploads through open_upload
+        from app.services.file_service import get_file_hash
+        return get_file_hash(file_path) == file_hash
+
+    target = cold_path(file_hash, EXTENSIONS[0] if zstandard is not None else EXTENSIONS[1])
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    sha256 = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as source, open(temp_path, 'wb') as raw:
+            if zstandard is not None:
+                writer = zstandard.ZstdCompressor(level=current_app.config.get('COLD_STORAGE_ZSTD_LEVEL', 10)).stream_writer(raw, closefd=False)
+            else:
+                writer = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0)
+            with writer:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    writer.write(chunk)
+
+        # Same-named uploads share a path, so the file may have been replaced since it was recorded
+        if sha256.hexdigest() != file_hash:
+            logger.warning(f"{file_path} no longer matches its recorded hash; leaving it out of cold storage")
+            os.remove(temp_path)
+            return False
+        os.replace(temp_path, target)
+        return True
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def freeze_uploads(files):
+    """
+    Move the raw uploads of archived insights, given as (file_path, file_hash)
+    pairs, to the cold tier. A hot file is deleted once its cold copy exists and
+    no operational file record points at the same path.
+    """
+    files = set(files)
+    if not files:
+        return 0
+
+    paths = {file_path for file_path, _ in files}
+    in_use = set(db.session.execute(select(File.file_path).where(File.file_path.in_(paths))).scalars())
+    frozen = saved = 0
+    for file_path, file_hash in files:
+        try:
+            if not freeze_upload(file_path, file_hash) or file_path in in_use:
+                continue
+            saved += os.path.getsize(file_path)
+            os.remove(file_path)
+            frozen += 1
+        except Exception as e:
+            logger.warning(f"Could not move {file_path} to cold storage: {str(e)}")
+
+    logger.info(f"Moved {frozen} archived uploads to cold storage, freeing {saved / 1024 / 1024:.1f} MB")
+    return frozen
+
+@contextmanager
+def open_upload(file_path, file_hash):
+    """
+    Binary stream of an upload's content. The cold copy is addressed by content,
+    so it is preferred when present; it is decompressed as it is read.
+    """
+    cold_copy = find_cold_copy(file_hash) if file_hash else None
+    if cold_copy is None:
+        with open(file_path, 'rb') as f:
+            yield f
+    elif cold_copy.endswith('.zst'):
+        if zstandard is None:
+            raise OSError(f"{cold_copy} is zstd-compressed but zstandard is not installed")
+        with open(cold_copy, 'rb') as raw, zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+            yield reader
+    else:
+        with gzip.open(cold_copy, 'rb') as reader:
+            yield reader
+
+def enforce_retention():
+    """
+    Delete cold copies older than COLD_STORAGE_MAX_AGE_DAYS, then the oldest ones
+    until the tier fits in COLD_STORAGE_MAX_BYTES. Copies of uploads that belong
+    to an operational insight are always kept.
+    """
+    folder = current_app.config['COLD_STORAGE_FOLDER']
+    max_age_days = current_app.config.get('COLD_STORAGE_MAX_AGE_DAYS')
+    max_bytes = current_app.config.get('COLD_STORAGE_MAX_BYTES')
+    if not os.path.isdir(folder) or (max_age_days is None and max_bytes is None):
+        return 0
+
+    copies = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if name.endswith(EXTENSIONS):
+                stat = os.stat(os.path.join(root, name))
+                copies.append((stat.st_mtime, stat.st_size, os.path.join(root, name), name.split('.', 1)[0]))
+    copies.sort()
+
+    live = set(db.session.execute(select(File.file_hash).distinct()).scalars())
+    total = sum(size for _, size, _, _ in copies)
+    expires_before = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    removed = 0
+    for modified, size, path, file_hash in copies:
+        expired = expires_before is not None and modified < expires_before
+        over_budget = max_bytes is not None and total > max_bytes
+        if not expired and not over_budget:
+            break  # oldest first, so the rest are newer and the tier is within budget
+        if file_hash in live:
+            continue
+        os.remove(path)
+        total -= size
+        removed += 1
+
+    logger.info(f"Cold storage retention removed {removed} uploads; {total / 1024 / 1024:.1f} MB remain")
+    return removed
@@ -1,14 +1,19 @@
 import hashlib
 import os
 from datetime import datetime, date
-from sqlalchemy import Date, cast
 from app import db
 from app.models.operational import CommonItemPairs, CustomerFrequency, CustomerSegments, File, Insight, ItemFrequency, MonthlySales, OrderStatus, QuantityPriceData, SalesData, SalesOverTime, SeasonalItems
 import pandas as pd
 from collections import Counter
 from itertools import combinations  
+from flask import current_app
 
+from app.services.analytics_service import get_columnar_tables
 from app.services.audit_service import log_audit
+from app.services.cold_storage import open_upload
+from app.services.quota_service import count_insight, release_insight
+from app.services.statistics_service import refresh_insight_statistics
+from app.utils.dates import day_range
 from logging_config import default_logger as logger
 
 # Custom exceptions
@@ -18,7 +23,10 @@ class FileProcessingError(Exception):
 class DataValidationError(Exception):
     pass
 
-def create_insight(user_id): 
+def create_insight(user_id, reserved_day=None):
+    # `reserved_day` is the day whose quota slot the caller already took with reserve_insight;
+    # otherwise the insight is counted against the quota here
+    day = reserved_day or count_insight(user_id)
     try:
         insight = Insight(
             user_id=user_id, 
@@ -37,6 +45,7 @@ def create_insight(user_id):
         return insight
     except Exception as e:
         db.session.rollback()
+        release_insight(user_id, day)
         logger.error(f"Failed to create insight for user {user_id}: {str(e)}")
         raise FileProcessingError(f"Failed to create insight: {str(e)}")
 
@@ -57,6 +66,7 @@ def add_file_to_insight(insight_id, filename, file_path, user_id, file_size, fil
             insight_id=insight_id
         )
         db.session.add(file_record)
+        touch_insight(insight_id)
         db.session.commit()
         
         log_audit(
@@ -107,10 +117,18 @@ def get_file_type(filename):
 def get_all_insights(user_id):
     return Insight.query.filter_by(user_id=user_id).order_by(Insight.created_at.desc()).all()
 
+def touch_insight(insight_id):
+    # Insight.to_dict() embeds its files, so file changes must move the insight's validators too
+    Insight.query.filter(Insight.id == insight_id).update(
+        {Insight.updated_at: datetime.utcnow()}, synchronize_session=False
+    )
+
 def get_existing_insight(user_id,date): 
+    day_start, day_end = day_range(date)
     return Insight.query.filter(
         Insight.user_id == user_id, 
-        cast(Insight.created_at, Date) == date 
+        Insight.created_at >= day_start,
+        Insight.created_at < day_end
     ).first()
 
 def json_serial(obj):
@@ -118,6 +136,13 @@ def json_serial(obj):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
+def _warm_columnar_tables(app, insight_id):
+    with app.app_context():
+        try:
+            get_columnar_tables(insight_id)
+        except Exception as e:
+            logger.warning(f"Could not build columnar cache for insight {insight_id}: {str(e)}")
+
 def process_files(file_id, insight_id): 
     try:
         file_upload = File.query.get(file_id)
@@ -126,7 +151,9 @@ def process_files(file_id, insight_id):
             raise FileProcessingError(f"File with ID {file_id} not found")
 
         logger.info(f"Processing file: {file_upload.filename} for insight: {insight_id}")
-        df = pd.read_csv(file_upload.file_path, encoding='ISO-8859-1')
+        # Archived uploads may only exist in the cold tier; they are decompressed as read
+        with open_upload(file_upload.file_path, file_upload.file_hash) as upload:
+            df = pd.read_csv(upload, encoding='ISO-8859-1')
         
         file_type = identify_file_type(df)
         logger.info(f"Identified file type: {file_type}")
@@ -141,6 +168,7 @@ def process_files(file_id, insight_id):
         # Update file status after processing
         old_file_values = file_upload.to_dict()
         file_upload.status = 'Processed'
+        touch_insight(insight_id)
         db.session.commit()
         
         log_audit(
@@ -150,6 +178,16 @@ def process_files(file_id, insight_id):
             old_values=old_file_values,
             new_values=file_upload.to_dict()
         )
+
+        # Build the columnar copy used for filtered chatbot questions off the request; the first
+        # filtered question builds it if this job has not run
+        try:
+            current_app.apscheduler.add_job(
+                f'columnar-{insight_id}', _warm_columnar_tables,
+                args=[current_app._get_current_object(), insight_id], replace_existing=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not queue columnar cache build for insight {insight_id}: {str(e)}")
         
     except pd.errors.EmptyDataError:
         logger.error("The file is empty or contains no data")
@@ -341,6 +379,9 @@ def insert_sales_analysis(insight_id, data):
                 record_id=quantity_price_data.id,
                 new_values=quantity_price_data.to_dict()
             )
+
+        # Summaries the chatbot answers from, over every file's rows
+        refresh_insight_statistics(insight_id)
  
         insight.updated_at = datetime.utcnow()
 
@@ -466,6 +507,9 @@ def insert_market_analysis(insight_id, data):
                 record_id=customer_segment.id,
                 new_values=customer_segment.to_dict()
             )
+
+        # Summaries the chatbot answers from, over every file's rows
+        refresh_insight_statistics(insight_id)
  
         insight.updated_at = datetime.utcnow()
 
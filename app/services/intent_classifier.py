@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import click
+import joblib
+import numpy as np
+import sklearn
+from flask import current_app
+from flask.cli import with_appcontext
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from logging_config import default_logger as logger
+
+DEFAULT_CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'intent_utterances.json'
+)
+
+def load_corpus(path: str = DEFAULT_CORPUS_PATH):
+    with open(path, encoding='utf-8') as f:
+        corpus = json.load(f)
+    utterances, intents = [], []
+    for intent, examples in corpus.items():
+        utterances.extend(examples)
+        intents.extend([intent] * len(examples))
+    return utterances, intents
+
+def corpus_digest(path: str = DEFAULT_CORPUS_PATH) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class IntentClassifier:
+    def __init__(self, pipeline, digest: str = None):
+        self.pipeline = pipeline
+        self.digest = digest
+        self.classes = list(pipeline.classes_)
+
+    @classmethod
+    def train(cls, utterances, intents, digest: str = None) -> 'IntentClassifier':
+        # Character n-grams within word boundaries tolerate typos without a spelling pass
+        pipeline = make_pipeline(
+            TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 4), sublinear_tf=True, lowercase=True),
+            LogisticRegression(C=20, max_iter=2000)
+        )
+        pipeline.fit(utterances, intents)
+        return cls(pipeline, digest)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Uncompressed so workers can memory-map the arrays; replace atomically so a
+        # concurrently starting worker never loads a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump({
+            'pipeline': self.pipeline,
+            'digest': self.digest,
+            'sklearn_version': sklearn.__version__,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'IntentClassifier':
+        bundle = joblib.load(path, mmap_mode='r')
+        if bundle.get('sklearn_version') != sklearn.__version__:
+            raise ValueError(f"model was trained with scikit-learn {bundle.get('sklearn_version')}")
+        return cls(bundle['pipeline'], bundle.get('digest'))
+
+    def predict(self, queries):
+        """Return an (intent, confidence) pair for each query."""
+        if not queries:
+            return []
+        probabilities = self.pipeline.predict_proba(list(queries))
+        best = np.argmax(probabilities, axis=1)
+        return [
+            (self.classes[index], float(row[index]))
+            for index, row in zip(best, probabilities)
+        ]
+
+    def predict_one(self, query: str):
+        return self.predict([query])[0]
+
+def train_and_save(model_path: str, corpus_path: str = DEFAULT_CORPUS_PATH) -> IntentClassifier:
+    utterances, intents = load_corpus(corpus_path)
+    classifier = IntentClassifier.train(utterances, intents, corpus_digest(corpus_path))
+    classifier.save(model_path)
+    logger.info(f"Trained intent classifier on {len(utterances)} utterances, saved to {model_path}")
+    return classifier
+
+def init_intent_classifier(app):
+    model_path = app.config['INTENT_CLASSIFIER_PATH']
+    corpus_path = app.config.get('INTENT_CORPUS_PATH') or DEFAULT_CORPUS_PATH
+    digest = corpus_digest(corpus_path)
+
+    classifier = None
+    if os.path.exists(model_path):
+        try:
+            classifier = IntentClassifier.load(model_path)
+        except Exception as e:
+            logger.warning(f"Could not load intent classifier from {model_path}: {str(e)}")
+        if classifier is not None and classifier.digest != digest:
+            logger.info("Intent corpus changed since the classifier was trained; retraining")
+            classifier = None
+
+    if classifier is None:
+        classifier = train_and_save(model_path, corpus_path)
+
+    app.extensions['intent_classifier'] = classifier
+    return classifier
+
+def get_intent_classifier():
+    return current_app.extensions.get('intent_classifier')
+
+@click.command('train-intent-classifier')
+@with_appcontext
+def train_intent_classifier_command():
+    """Train the chatbot intent classifier from the bundled utterance corpus."""
+    model_path = current_app.config['INTENT_CLASSIFIER_PATH']
+    corpus_path = current_app.config.get('INTENT_CORPUS_PATH') or DEFAULT_CORPUS_PATH
+    classifier = train_and_save(model_path, corpus_path)
+    current_app.extensions['intent_classifier'] = classifier
+    click.echo(f"Intent classifier written to {model_path}")
@@ -0,0 +1,146 @@
+import atexit
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.operational import Lease
+from logging_config import default_logger as logger
+
+def try_acquire(name, holder, ttl):
+    """
+    Take or renew the lease `name` for `holder` for `ttl` seconds. Returns True when
+    `holder` owns the lease afterwards.
+
+    The conditional UPDATE only succeeds for the current holder or once the lease
+    has expired, so at most one process holds a lease at any time. Expiry is
+    compared with the callers' clocks; keep the TTL well above any clock skew.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    table = Lease.__table__
+    with db.engines['operational'].begin() as connection:
+        renewed = connection.execute(
+            update(table)
+            .where(table.c.name == name, or_(table.c.holder == holder, table.c.expires_at < now))
+            .values(
+                holder=holder, expires_at=expires_at,
+                # acquired_at only moves when ownership changes hands
+                acquired_at=case((table.c.holder == holder, table.c.acquired_at), else_=now)
+            )
+        ).rowcount
+    if renewed:
+        return True
+
+    try:
+        with db.engines['operational'].begin() as connection:
+            connection.execute(insert(table).values(name=name, holder=holder, acquired_at=now, expires_at=expires_at))
+        return True
+    except IntegrityError:
+        return False  # held by someone else
+
+def release(name, holder):
+    table = Lease.__table__
+    with db.engines['operational'].begin() as connection:
+        connection.execute(delete(table).where(table.c.name == name, table.c.holder == holder))
+
+class LeaderElection:
+    """
+    Keeps one process per cluster as the holder of a named lease.
+
+    Every process runs a heartbeat thread that renews the lease while it holds
+    it and tries to take it over once it expires, so a crashed leader is replaced
+    within LEADER_LEASE_TTL seconds. A clean shutdown releases the lease at once.
+
+    The leader runs each scheduled job in full; jobs do not hand parts of their
+    work to the other processes. Archiving is paced and paused for the whole
+    cluster's sake, so more archiving processes would only share the same budget.
+    """
+    def __init__(self, app, name='scheduler'):
+        self.app = app
+        self.name = name
+        self.ttl = app.config.get('LEADER_LEASE_TTL', 60)
+        self.heartbeat_interval = app.config.get('LEADER_HEARTBEAT_INTERVAL', 15)
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._leader = False
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def start(self):
+        # Threads do not survive a fork; each worker campaigns with its own identity
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f'lease-{self.name}', daemon=True)
+            self._thread.start()
+
+    def _heartbeat(self):
+        try:
+            with self.app.app_context():
+                leader = try_acquire(self.name, self.holder, self.ttl)
+        except Exception as e:
+            # Without a renewal the lease lapses, so stop acting as leader right away
+            logger.error(f"Lease '{self.name}' heartbeat failed: {str(e)}")
+            leader = False
+        if leader != self._leader:
+            logger.info(f"{self.holder} {'acquired' if leader else 'lost'} the '{self.name}' lease")
+        self._leader = leader
+        return leader
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._heartbeat()
+            self._stopping.wait(self.heartbeat_interval)
+
+    def is_leader(self, renew=False):
+        """Whether this process holds the lease; `renew` confirms it with the database first."""
+        self.start()
+        return self._heartbeat() if renew else self._leader
+
+    def close(self):
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stopping.set()
+        if self._leader:
+            try:
+                with self.app.app_context():
+                    release(self.name, self.holder)
+            except Exception as e:
+                logger.warning(f"Could not release the '{self.name}' lease: {str(e)}")
+            self._leader = False
+
+def is_scheduler_leader():
+    """Whether scheduled jobs should run in this process; call it inside the job's app context."""
+    election = get_leader_election()
+    if election is None:
+        return True
+    if election.is_leader(renew=True):
+        return True
+    logger.info(f"Skipping scheduled jobs in {election.holder}: another process holds the scheduler lease")
+    return False
+
+def holds_scheduler_lease():
+    """
+    Renew the scheduler lease and report whether this process still holds it. Long
+    jobs check it between units of work and stop once it is lost, before the new
+    leader's run of the same job overlaps with theirs.
+    """
+    election = get_leader_election()
+    return election is None or election.is_leader(renew=True)
+
+def init_leader_election(app):
+    # The heartbeat starts with the first scheduled job, so CLI commands never touch the lease
+    election = LeaderElection(app) if app.config.get('SCHEDULER_LEADER_ELECTION', True) else None
+    app.extensions['leader_election'] = election
+
+def get_leader_election():
+    return current_app.extensions.get('leader_election')
@@ -0,0 +1,102 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.operational import Insight, InsightQuota
+from app.utils.caching import TTLCache
+from app.utils.dates import day_range
+
+# Insights a user may create per UTC day, by subscription PlanName
+INSIGHT_LIMITS = {'Basic': 2, 'Pro': 5, 'Enterprise': 10}
+DEFAULT_INSIGHT_LIMIT = 1
+
+_exhausted_cache = None
+
+def _exhausted():
+    # (user_id, day) -> the limit the user is known to have used up, so repeated attempts skip the database
+    global _exhausted_cache
+    if _exhausted_cache is None:
+        _exhausted_cache = TTLCache(
+            current_app.config.get('SUBSCRIPTION_CACHE_SIZE', 10000),
+            current_app.config.get('SUBSCRIPTION_CACHE_TTL', 300)
+        )
+    return _exhausted_cache
+
+def get_insight_limit(plan_name):
+    return INSIGHT_LIMITS.get(plan_name, DEFAULT_INSIGHT_LIMIT)
+
+def _count(user_id, day, limit=None):
+    """
+    Count one more insight for `user_id` on `day`, unless `limit` insights are already
+    counted. Returns True when it was counted.
+
+    The first insight of a day seeds the counter from the insights the user already
+    created that day; after that each call is a single conditional UPDATE, so the
+    check and the increment cannot interleave with another worker's.
+    """
+    day_start, day_end = day_range(day)
+    table = InsightQuota.__table__
+    engine = db.engines['operational']
+
+    for _ in range(2):
+        with engine.begin() as connection:
+            query = update(table).where(table.c.user_id == user_id, table.c.day == day)
+            if limit is not None:
+                query = query.where(table.c.used < limit)
+            if connection.execute(query.values(used=table.c.used + 1)).rowcount:
+                return True
+            if limit is not None and connection.execute(
+                select(table.c.used).where(table.c.user_id == user_id, table.c.day == day)
+            ).first() is not None:
+                return False
+
+        try:
+            with engine.begin() as connection:
+                used = connection.execute(
+                    select(func.count()).select_from(Insight).where(
+                        Insight.user_id == user_id,
+                        Insight.created_at >= day_start,
+                        Insight.created_at < day_end
+                    )
+                ).scalar()
+                counted = limit is None or used < limit
+                connection.execute(insert(table).values(user_id=user_id, day=day, used=used + (1 if counted else 0)))
+            return counted
+        except IntegrityError:
+            continue  # another worker seeded today's counter first; update that one
+    return False
+
+def reserve_insight(user_id, limit):
+    """
+    Take one of the user's `limit` insights for today. Returns the day the insight was
+    counted against, to hand back to release_insight, or None when they are all used.
+    """
+    day = datetime.utcnow().date()
+    key = (str(user_id), day)
+    if _exhausted().get(key) == limit:
+        return None
+    if _count(user_id, day, limit):
+        return day
+    _exhausted().put(key, limit)
+    return None
+
+def count_insight(user_id):
+    """
+    Count an insight created without a reservation, so it still uses up the day's quota.
+    Returns the day it was counted against.
+    """
+    day = datetime.utcnow().date()
+    _count(user_id, day)
+    return day
+
+def release_insight(user_id, day):
+    """Give back an insight reserved or counted on `day` whose creation failed."""
+    table = InsightQuota.__table__
+    with db.engines['operational'].begin() as connection:
+        connection.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.day == day, table.c.used > 0)
+            .values(used=table.c.used - 1)
+        )
+    _exhausted().pop((str(user_id), day))
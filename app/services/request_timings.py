@@ -0,0 +1,66 @@
+import json
+import math
+import os
+import socket
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from app import db
+from app.models.operational import RequestTiming
+from logging_config import default_logger as logger
+
+# Upper bounds, in milliseconds, of the latency buckets processes report; slower requests
+# fall in one more bucket. Thresholds such as ARCHIVE_PAUSE_LATENCY_MS are best set to a bound
+BUCKETS_MS = (50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+def _holder():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def publish_request_timings(app):
+    """
+    Share this process's request latencies over the last REQUEST_TIMING_WINDOW with
+    the other processes, as one RequestTimings row per process. Runs in every worker.
+    """
+    with app.app_context():
+        timer = app.extensions.get('request_timer')
+        if timer is None:
+            return
+        counts = timer.histogram([bound / 1000 for bound in BUCKETS_MS])
+        now = datetime.utcnow()
+        holder = _holder()
+        table = RequestTiming.__table__
+        try:
+            with db.engines['operational'].begin() as connection:
+                # Rows of processes that stopped reporting are long out of the window
+                connection.execute(delete(table).where(table.c.reported_at < now - timedelta(days=1)))
+                values = {'reported_at': now, 'histogram': json.dumps(counts)}
+                if not connection.execute(update(table).where(table.c.holder == holder).values(**values)).rowcount:
+                    connection.execute(insert(table).values(holder=holder, **values))
+        except Exception as e:
+            logger.warning(f"Could not publish request timings: {str(e)}")
+
+def cluster_percentile(q=0.95):
+    """
+    The q-th percentile of request latency in milliseconds across the processes still
+    reporting, rounded up to a bucket bound (inf past the last one), or None without
+    traffic. Database errors propagate to the caller.
+    """
+    table = RequestTiming.__table__
+    # A process that missed two reports has stopped, or cannot reach the database either
+    since = datetime.utcnow() - timedelta(seconds=2 * current_app.config.get('REQUEST_TIMING_PUBLISH_SECONDS', 15))
+    with db.engines['operational'].connect() as connection:
+        histograms = connection.execute(select(table.c.histogram).where(table.c.reported_at >= since)).scalars().all()
+
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for histogram in histograms:
+        for bucket, count in enumerate(json.loads(histogram)[:len(counts)]):
+            counts[bucket] += count
+    total = sum(counts)
+    if not total:
+        return None
+
+    seen = 0
+    for bucket, count in enumerate(counts):
+        seen += count
+        if seen >= q * total:
+            return BUCKETS_MS[bucket] if bucket < len(BUCKETS_MS) else math.inf
@@ -0,0 +1,138 @@
+import math
+import numpy as np
+from app import db
+from app.models.operational import InsightStatistics, MonthlySales, QuantityPriceData, SalesOverTime
+from logging_config import default_logger as logger
+
+def _number(value):
+    # NaN/inf (constant series, zero denominators) are stored as NULL; SQL Server floats reject them
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def _percent_change(first, last):
+    return _number((last - first) / first * 100) if first else None
+
+def sales_over_time_statistics(dates, sales):
+    """Summary of the per-period sales series, in chronological order."""
+    sales = np.asarray(sales, dtype=float)
+    if not sales.size:
+        return {}
+    peak, low = int(np.argmax(sales)), int(np.argmin(sales))
+    return {
+        'sales_period_count': int(sales.size),
+        'sales_total': _number(sales.sum()),
+        'sales_average': _number(sales.mean()),
+        'sales_peak_date': dates[peak],
+        'sales_peak': _number(sales[peak]),
+        'sales_low_date': dates[low],
+        'sales_low': _number(sales[low]),
+        'sales_trend_pct': _percent_change(sales[0], sales[-1]),
+        'sales_recent_average': _number(sales[-7:].mean()) if sales.size >= 7 else None,
+    }
+
+def quantity_price_statistics(prices, quantities):
+    prices = np.asarray(prices, dtype=float)
+    quantities = np.asarray(quantities, dtype=float)
+    if not prices.size:
+        return {}
+
+    price_p25, price_p75 = np.percentile(prices, [25, 75])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = np.corrcoef(prices, quantities)[0, 1] if prices.size > 1 else math.nan
+        # Simple elasticity: relative change in mean quantity between the top and bottom
+        # price quartiles over the relative change in price
+        high_quantity = quantities[prices >= price_p75].mean()
+        low_quantity = quantities[prices <= price_p25].mean()
+        elasticity = ((high_quantity - low_quantity) / low_quantity) / ((price_p75 - price_p25) / price_p25)
+
+    return {
+        'quantity_price_sample_size': int(prices.size),
+        'price_mean': _number(prices.mean()),
+        'price_median': _number(np.median(prices)),
+        'price_p25': _number(price_p25),
+        'price_p75': _number(price_p75),
+        'quantity_mean': _number(quantities.mean()),
+        'quantity_median': _number(np.median(quantities)),
+        'price_quantity_correlation': _number(correlation),
+        'price_elasticity': _number(elasticity),
+    }
+
+def seasonality_label(counts):
+    counts = np.asarray(counts, dtype=float)
+    if counts.size <= 12:
+        return "Insufficient data to detect seasonality"
+
+    # Compare each month with the same month a year earlier
+    avg_yearly_diff = np.abs(counts[12:] - counts[:-12]).mean()
+    average = counts.mean()
+    if avg_yearly_diff < 0.1 * average:
+        return "Strong seasonal pattern detected"
+    elif avg_yearly_diff < 0.2 * average:
+        return "Moderate seasonal pattern detected"
+    return "No clear seasonality detected"
+
+def recent_trend(values, periods=3):
+    values = np.asarray(values, dtype=float)
+    if values.size < periods:
+        return None
+    steps = np.diff(values[-periods:])
+    if (steps > 0).all():
+        return 'up'
+    if (steps < 0).all():
+        return 'down'
+    return 'fluctuating'
+
+def monthly_sales_statistics(dates, counts):
+    """Summary of the monthly transaction counts, in chronological order."""
+    counts = np.asarray(counts, dtype=np.int64)
+    if not counts.size:
+        return {}
+    peak, low = int(np.argmax(counts)), int(np.argmin(counts))
+    return {
+        'monthly_period_count': int(counts.size),
+        'monthly_total': int(counts.sum()),
+        'monthly_average': _number(counts.mean()),
+        'monthly_peak_date': dates[peak],
+        'monthly_peak': int(counts[peak]),
+        'monthly_low_date': dates[low],
+        'monthly_low': int(counts[low]),
+        'monthly_growth_pct': _percent_change(counts[0], counts[-1]) if counts.size >= 2 else None,
+        'monthly_seasonality': seasonality_label(counts),
+        'monthly_recent_trend': recent_trend(counts),
+    }
+
+def save_insight_statistics(insight_id, values):
+    """Merge `values` into the insight's statistics record; the caller commits."""
+    statistics = InsightStatistics.query.filter_by(insight_id=insight_id).first()
+    if statistics is None:
+        statistics = InsightStatistics(insight_id=insight_id)
+        db.session.add(statistics)
+    for column, value in values.items():
+        setattr(statistics, column, value)
+    logger.info(f"Stored {len(values)} precomputed statistics for insight {insight_id}")
+    return statistics
+
+def refresh_insight_statistics(insight_id):
+    """
+    Recompute the insight's statistics from all of its stored series, so they cover
+    every file added to it and match what the rows themselves give; the caller
+    flushes the new rows first and commits.
+    """
+    sales = db.session.query(SalesOverTime.order_date, SalesOverTime.daily_sales).filter(
+        SalesOverTime.insight_id == insight_id
+    ).order_by(SalesOverTime.order_date).all()
+    quantity_price = db.session.query(QuantityPriceData.price_each, QuantityPriceData.quantity_ordered).filter(
+        QuantityPriceData.insight_id == insight_id
+    ).all()
+    monthly = db.session.query(MonthlySales.date, MonthlySales.count).filter(
+        MonthlySales.insight_id == insight_id
+    ).order_by(MonthlySales.date).all()
+
+    values = {
+        **sales_over_time_statistics([row[0] for row in sales], [row[1] for row in sales]),
+        **quantity_price_statistics([row[0] for row in quantity_price], [row[1] for row in quantity_price]),
+        **monthly_sales_statistics([row[0] for row in monthly], [row[1] for row in monthly]),
+    }
+    if not values:
+        return None
+    return save_insight_statistics(insight_id, values)
@@ -0,0 +1,102 @@
+import json
+import uuid
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import types
+from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# An archived insight's child rows are stored as one versioned, compressed JSON
+# document. Each table is column-wise (names once, then rows of values), so key
+# names are not repeated per row.
+DOCUMENT_VERSION = 1
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)  # exact; floats would round Numeric(18, 2) amounts
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {value.__class__.__name__} is not JSON serializable')
+
+def _dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _compress(data):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return 'zlib', zlib.compress(data, ZLIB_LEVEL)
+
+def _decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Archived document is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown archive document codec: {codec}")
+
+def _decoder(column_type):
+    if isinstance(column_type, UNIQUEIDENTIFIER):
+        return uuid.UUID
+    if isinstance(column_type, types.Numeric) and column_type.asdecimal:
+        return Decimal
+    if isinstance(column_type, types.DateTime):
+        return datetime.fromisoformat
+    if isinstance(column_type, types.Date):
+        return date.fromisoformat
+    return None
+
+def encode_document(rows_by_model):
+    """
+    Compress {model: [row mappings]} into (codec, document). The insight_id
+    column is left out; every row in a document belongs to the same insight.
+    """
+    tables = {}
+    for model, rows in rows_by_model.items():
+        names = [column.name for column in model.__table__.columns if column.name != 'insight_id']
+        tables[model.__tablename__] = {
+            'columns': names,
+            'rows': [[row[name] for name in names] for row in rows]
+        }
+    return _compress(_dumps({'version': DOCUMENT_VERSION, 'tables': tables}))
+
+def decode_document(codec, document, models, insight_id):
+    """Expand a document back into {model: [row dicts]} for `models`, with column types restored."""
+    payload = _loads(_decompress(codec, document))
+    if payload.get('version') != DOCUMENT_VERSION:
+        raise ValueError(f"Unsupported archive document version: {payload.get('version')}")
+
+    decoded = {}
+    for model in models:
+        stored = payload['tables'].get(model.__tablename__, {'columns': [], 'rows': []})
+        decoders = [_decoder(model.__table__.c[name].type) for name in stored['columns']]
+        decoded[model] = [
+            {
+                'insight_id': insight_id,
+                **{
+                    name: decode(value) if decode and value is not None else value
+                    for name, decode, value in zip(stored['columns'], decoders, row)
+                }
+            }
+            for row in stored['rows']
+        ]
+    return decoded
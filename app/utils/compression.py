@@ -0,0 +1,176 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+from logging_config import default_logger as logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class _GzipStream:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        # Sync-flush per chunk so streamed rows reach the client immediately
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush()
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+class _ZstdStream:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+def _available_codecs():
+    codecs = {
+        'gzip': (lambda data, level: gzip.compress(data, compresslevel=level, mtime=0), _GzipStream),
+    }
+    if brotli is not None:
+        codecs['br'] = (lambda data, level: brotli.compress(data, quality=level), _BrotliStream)
+    if zstandard is not None:
+        codecs['zstd'] = (lambda data, level: zstandard.ZstdCompressor(level=level).compress(data), _ZstdStream)
+    return codecs
+
+class CompressedResponseCache:
+    """
+    Size-bounded LRU of compressed bodies keyed by (path, ETag, encoding).
+
+    Only responses carrying an ETag are cached: the validators from
+    app.utils.http_cache change whenever the underlying data does, so a given
+    key always maps to the same bytes.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+class Compress:
+    """
+    Negotiated response compression (zstd, brotli or gzip, depending on what
+    is installed and what the client accepts), registered as an after_request
+    hook.
+    """
+    def __init__(self, app=None):
+        self.cache = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_ALGORITHMS', ['zstd', 'br', 'gzip'])
+        app.config.setdefault('COMPRESS_LEVELS', {'gzip': 6, 'br': 4, 'zstd': 3})
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_MIMETYPES', ['application/json', 'application/x-ndjson', 'text/csv', 'text/plain'])
+        app.config.setdefault('COMPRESS_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+
+        if not app.config['COMPRESS_ENABLED']:
+            return
+
+        codecs = _available_codecs()
+        self.algorithms = [name for name in app.config['COMPRESS_ALGORITHMS'] if name in codecs]
+        self.codecs = codecs
+        self.levels = app.config['COMPRESS_LEVELS']
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.mimetypes = set(app.config['COMPRESS_MIMETYPES'])
+        self.cache = CompressedResponseCache(app.config['COMPRESS_CACHE_MAX_BYTES'])
+        logger.info(f"Response compression enabled: {', '.join(self.algorithms)}")
+
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code != 200
+                or request.method == 'HEAD'
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = request.accept_encodings.best_match(self.algorithms)
+        if encoding is None:
+            return response
+
+        compress, stream_class = self.codecs[encoding]
+        level = self.levels.get(encoding)
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, stream_class(level))
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+
+            etag, _ = response.get_etag()
+            cache_key = (request.path, etag, encoding) if etag else None
+            compressed = self.cache.get(cache_key) if cache_key else None
+            if compressed is None:
+                compressed = compress(body, level)
+                if cache_key:
+                    self.cache.put(cache_key, compressed)
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, compressor):
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
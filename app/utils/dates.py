@@ -0,0 +1,13 @@
+from datetime import datetime, time, timedelta
+
+def day_range(day):
+    """
+    Return the half-open [start, end) datetime range covering `day`.
+
+    Filtering with `column >= start, column < end` lets the database seek on an
+    index over the column, which `cast(column, Date) == day` does not.
+    """
+    if isinstance(day, datetime):
+        day = day.date()
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
@@ -0,0 +1,52 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def _as_http_date(value):
+    # Model timestamps are naive UTC; HTTP dates have one-second resolution
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+def is_not_modified(etag, last_modified=None):
+    """
+    Check the request's conditional headers against the current validators.
+
+    If-None-Match takes precedence over If-Modified-Since, as required by RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    last_modified = _as_http_date(last_modified)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+def apply_cache_headers(response, etag, last_modified=None, vary=None):
+    # Weak validators: the payload is semantically equal even when the encoding differs.
+    # `vary` names a request header the representation (and so `etag`) depends on.
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = _as_http_date(last_modified)
+    if vary:
+        response.vary.add(vary)
+
+    response.cache_control.private = True
+    max_age = current_app.config.get('HTTP_CACHE_MAX_AGE', 0)
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        # Let the browser keep the payload but revalidate on every poll
+        response.cache_control.no_cache = True
+    return response
+
+def not_modified_response(etag, last_modified=None, vary=None):
+    response = current_app.response_class(status=304)
+    return apply_cache_headers(response, etag, last_modified, vary)
+
+def insight_etag(insight):
+    return make_etag('insight', insight.id, insight.updated_at.isoformat() if insight.updated_at else None)
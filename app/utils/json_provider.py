@@ -0,0 +1,92 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_default(obj):
+    """
+    Encode the types our payloads carry that JSON has no native form for.
+
+    Dates, Decimals and UUIDs are encoded as Flask's default provider does
+    (RFC 822 dates, strings), so responses keep their format either way.
+    """
+    if isinstance(obj, (datetime, date)):
+        return http_date(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if np is not None:
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, falling back to the standard library
+    encoder when orjson is not installed, a caller passes json.dumps options,
+    or orjson cannot encode a value (integers beyond 64 bits).
+
+    NaN and infinite floats are encoded as null, where the standard library
+    wrote the bare NaN/Infinity tokens that JSON parsers reject.
+    """
+    default = staticmethod(json_default)
+
+    def _orjson_options(self, indent=False):
+        # Analysis payloads use int keys (months, purchase frequencies); datetimes
+        # go through `default` so they keep Flask's format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _orjson_dumps(self, obj, indent=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent=indent))
+        except orjson.JSONEncodeError:
+            # The standard library encodes what orjson refuses, and raises for what neither can
+            return super().dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+    def dumps_bytes(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return self.dumps(obj, **kwargs).encode('utf-8')
+        return self._orjson_dumps(obj)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._orjson_dumps(obj, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,47 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(sort_value, row_id):
+    # Row ids are UUIDs, or integers for tie-break columns such as ChatMessage.sequence
+    payload = json.dumps([sort_value.isoformat(), row_id if isinstance(row_id, int) else str(row_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sort_value), row_id if isinstance(row_id, int) else uuid.UUID(row_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+def keyset_filter(sort_column, id_column, key, descending):
+    """Rows strictly after `key` = (sort_value, id) in (sort_column, id_column) order."""
+    last_sort, last_id = key
+    if descending:
+        return or_(sort_column < last_sort, and_(sort_column == last_sort, id_column < last_id))
+    return or_(sort_column > last_sort, and_(sort_column == last_sort, id_column > last_id))
+
+def keyset_page(query, sort_column, id_column, limit, before=None, after=None):
+    """
+    One page of `query` in ascending (sort_column, id_column) order.
+
+    `after` returns the `limit` rows following that key; otherwise the page is the
+    `limit` rows preceding `before`, or the last `limit` rows when neither is given.
+    Only limit + 1 rows are read, whatever the size of the table, and the extra row
+    just tells whether there is more in the direction of travel.
+    """
+    if after is not None:
+        query = query.filter(keyset_filter(sort_column, id_column, after, descending=False))
+        rows = query.order_by(sort_column.asc(), id_column.asc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+
+    if before is not None:
+        query = query.filter(keyset_filter(sort_column, id_column, before, descending=True))
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    return rows[:limit][::-1], len(rows) > limit
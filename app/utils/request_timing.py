@@ -0,0 +1,60 @@
+import bisect
+import threading
+import time
+from collections import deque
+from flask import g
+
+class RequestTimer:
+    """
+    Rolling record of how long this process took to answer its recent requests,
+    so background work can back off while interactive traffic is slow.
+    """
+    def __init__(self, app=None):
+        self._durations = deque()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REQUEST_TIMING_WINDOW', 60)
+        app.config.setdefault('REQUEST_TIMING_MAX_SAMPLES', 1000)
+
+        self.window = app.config['REQUEST_TIMING_WINDOW']
+        self._durations = deque(maxlen=app.config['REQUEST_TIMING_MAX_SAMPLES'])
+        app.extensions['request_timer'] = self
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    def before_request(self):
+        g._request_started = time.perf_counter()
+
+    def after_request(self, response):
+        started = g.pop('_request_started', None)
+        if started is not None:
+            with self._lock:
+                self._durations.append((time.monotonic(), time.perf_counter() - started))
+        return response
+
+    def _recent(self):
+        since = time.monotonic() - self.window
+        with self._lock:
+            return [duration for finished, duration in self._durations if finished >= since]
+
+    def percentile(self, q=0.95):
+        """The q-th percentile of request durations in seconds over the last window, or None without traffic."""
+        durations = sorted(self._recent())
+        if not durations:
+            return None
+        return durations[min(int(q * len(durations)), len(durations) - 1)]
+
+    def histogram(self, bounds):
+        """
+        Request counts over the last window per bucket of `bounds` (ascending upper
+        bounds in seconds), plus a last bucket for slower requests. Histograms of
+        several processes add up, where their percentiles would not.
+        """
+        counts = [0] * (len(bounds) + 1)
+        for duration in self._recent():
+            counts[bisect.bisect_left(bounds, duration)] += 1
+        return counts
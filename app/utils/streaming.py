@@ -0,0 +1,120 @@
+from itertools import chain
+from flask import current_app, request, stream_with_context
+from app import db
+from app.utils.pagination import keyset_filter
+from logging_config import default_logger as logger
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+SSE_MIMETYPE = 'text/event-stream'
+
+_END = object()
+
+def wants_ndjson():
+    # */* and plain application/json keep the JSON array format
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def stream_mimetype():
+    """The media type stream_items answers this request with; part of any validator of its body."""
+    return NDJSON_MIMETYPE if wants_ndjson() else current_app.json.mimetype
+
+def iter_keyset(query, sort_column, id_column, descending=True, batch_size=None):
+    """
+    Yield the rows of `query` ordered by (sort_column, id_column), fetching one
+    bounded keyset page at a time.
+
+    Each page is fully read before its rows are handed out, so lazy loads made
+    while serializing a row never run against an open result set. Rows are
+    expunged once the consumer moves on, which keeps the session's identity
+    map, and so worker memory, flat regardless of how many rows there are.
+    """
+    batch_size = batch_size or current_app.config.get('STREAM_BATCH_SIZE', 50)
+    order_by = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+    last_key = None
+
+    while True:
+        page_query = query
+        if last_key is not None:
+            page_query = page_query.filter(keyset_filter(sort_column, id_column, last_key, descending))
+
+        rows = page_query.order_by(*order_by).limit(batch_size).all()
+        for row in rows:
+            yield row
+            if row in db.session:
+                db.session.expunge(row)
+
+        if len(rows) < batch_size:
+            return
+        last_key = (getattr(rows[-1], sort_column.key), getattr(rows[-1], id_column.key))
+
+def _json_array_chunks(items, serialize, wrap_key=None):
+    dumps = current_app.json.dumps
+    yield '{%s: [' % dumps(wrap_key) if wrap_key else '['
+    first = True
+    for item in items:
+        yield ('' if first else ',') + dumps(serialize(item))
+        first = False
+    yield ']}' if wrap_key else ']'
+
+def _ndjson_chunks(items, serialize):
+    dumps = current_app.json.dumps
+    for item in items:
+        yield dumps(serialize(item)) + '\n'
+
+def stream_items(items, serialize, wrap_key=None, endpoint=None):
+    """
+    Stream `items` as a JSON array (optionally wrapped as {wrap_key: [...]}), or
+    as newline-delimited JSON when the client asks for application/x-ndjson.
+    Each item is encoded and flushed on its own, so the first byte goes out as
+    soon as the first row is read.
+
+    The first item is read before the response is returned, so a query that
+    fails outright raises here, where the caller can still answer with an error
+    status, rather than as a truncated 200 body.
+    """
+    items = iter(items)
+    first = next(items, _END)
+    items = iter(()) if first is _END else chain([first], items)
+    mimetype = stream_mimetype()
+    if mimetype == NDJSON_MIMETYPE:
+        chunks = _ndjson_chunks(items, serialize)
+    else:
+        chunks = _json_array_chunks(items, serialize, wrap_key)
+
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated body
+            logger.error(f"Error while streaming {endpoint or request.path}: {str(e)}")
+            raise
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.vary.add('Accept')
+    return response
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+def stream_events(events, endpoint=None):
+    """
+    Stream the (event, data) pairs of the `events` generator as server-sent events.
+    A failure after the first byte is reported to the client as a final `error`
+    event. When the client disconnects, `events` is closed while the request
+    context is still active.
+    """
+    def generate():
+        try:
+            for event, data in events:
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.error(f"Error while streaming {endpoint or request.path}: {str(e)}")
+            db.session.rollback()
+            yield sse_event('error', {'error': str(e)})
+        finally:
+            events.close()
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=SSE_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,44 @@
+"""
+Latency of filtered chatbot questions against the columnar cache. The sample
+sales upload is tiled up to the requested row count, encoded once, and each
+question is timed from entity extraction to the formatted answer.
+
+    python -m benchmarks.adhoc_analytics [rows]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+from app.services.analytics_service import ColumnarTable, answer_adhoc_query, extract_entities
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+
+QUESTIONS = [
+    "sales of Classic Cars in France in 2004",
+    "top 5 countries by sales in Q1 2004",
+    "bottom 3 product lines by quantity between 2003 and 2004",
+    "average price of Motorcycles in March 2004",
+    "how many orders from USA were cancelled",
+    "sales by deal size for Vintage Cars",
+]
+
+def main(rows=2_000_000, repeat=20):
+    sample = pd.read_csv(os.path.join(UPLOAD_FOLDER, 'sales_data_sample.csv'), encoding='ISO-8859-1')
+    df = pd.concat([sample] * (rows // len(sample) + 1), ignore_index=True).iloc[:rows]
+
+    start = time.perf_counter()
+    table = ColumnarTable.from_frame(df, 'sales')
+    print(f"encoded {table.row_count:,} rows in {time.perf_counter() - start:.2f} s")
+
+    print(f"{'question':<62} {'ms':>8}")
+    for question in QUESTIONS:
+        answer_adhoc_query(table, extract_entities(table, question))  # builds the value matcher once
+        start = time.perf_counter()
+        for _ in range(repeat):
+            answer_adhoc_query(table, extract_entities(table, question))
+        elapsed = (time.perf_counter() - start) / repeat * 1e3
+        print(f"{question:<62} {elapsed:8.2f}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,52 @@
+"""
+Held-out accuracy and latency of the trained intent classifier against the
+regex/fuzzy matcher. Utterances come from the bundled corpus; each fold trains
+on the rest and scores both approaches on the held-out part.
+
+    python -m benchmarks.intent_classifier [folds]
+"""
+import sys
+import time
+
+from sklearn.model_selection import StratifiedKFold
+
+from app.services.chatbot_service import ChatbotService
+from app.services.intent_classifier import IntentClassifier, load_corpus
+
+def per_query_us(func, queries, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            func(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+def main(folds=5):
+    utterances, intents = load_corpus()
+    service = ChatbotService()
+
+    classifier_hits = matcher_hits = 0
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0).split(utterances, intents)
+    for train_index, test_index in splits:
+        classifier = IntentClassifier.train([utterances[i] for i in train_index], [intents[i] for i in train_index])
+        held_out = [utterances[i] for i in test_index]
+        expected = [intents[i] for i in test_index]
+        predicted = [intent for intent, _ in classifier.predict(held_out)]
+        classifier_hits += sum(p == e for p, e in zip(predicted, expected))
+        matcher_hits += sum(service.match_intent(q) == e for q, e in zip(held_out, expected))
+
+    total = len(utterances)
+    print(f"held-out accuracy over {total} utterances ({folds} folds)")
+    print(f"  classifier  {classifier_hits / total:6.1%}")
+    print(f"  regex/fuzzy {matcher_hits / total:6.1%}")
+
+    classifier = IntentClassifier.train(utterances, intents)
+    start = time.perf_counter()
+    classifier.predict(utterances)
+    batch = (time.perf_counter() - start) / total * 1e6
+    print("latency per query")
+    print(f"  classifier single {per_query_us(classifier.predict_one, utterances):8.1f} µs")
+    print(f"  classifier batch  {batch:8.1f} µs")
+    print(f"  regex/fuzzy       {per_query_us(service.match_intent, utterances):8.1f} µs")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,63 @@
+"""
+Per-query latency of ChatbotService.identify_intent against the previous
+loop of one re.search per intent, plus an agreement check between the two
+over the sample queries, every phrase the patterns expand to, and every
+ordered pair of phrases joined into one query.
+
+    python -m benchmarks.intent_matching [iterations]
+"""
+import itertools
+import re
+import sys
+import timeit
+
+from app.services.chatbot_service import INTENT_PATTERNS, ChatbotService, _expand_phrases
+
+QUERIES = [
+    # Sample questions from the README
+    "What are our monthly sales trends?",
+    "Can you show me the sales over time?",
+    "Which are the top-selling products?",
+    "How are our customer segments distributed?",
+    "What's the frequency of customer purchases?",
+    "Can you explain the relationship between quantity and price?",
+    "How are the performance of different product categories?",
+    "What's the current order status distribution?",
+    # Misses scan the whole query against every pattern
+    "How much did we make from the new widgets in the northern region last quarter?",
+    "montly sales trnd",
+    # A lower-priority phrase overlaps the start of a higher-priority one
+    "sales trend of sales for this month",
+]
+
+def agreement_corpus():
+    phrases = sorted({phrase for pattern in INTENT_PATTERNS.values() for phrase in _expand_phrases(pattern)})
+    return QUERIES + phrases + [f"{first} {second}" for first, second in itertools.permutations(phrases, 2)]
+
+def legacy_identify_intent(query):
+    for intent, pattern in INTENT_PATTERNS.items():
+        if re.search(pattern, query, re.IGNORECASE):
+            return intent
+    return 'unknown'
+
+def main(iterations=20000):
+    service = ChatbotService()
+    corpus = agreement_corpus()
+    # Queries the loop cannot match go to the fuzzy tier, which answers some of them on purpose
+    mismatches = [
+        q for q in corpus
+        if legacy_identify_intent(q) != 'unknown' and legacy_identify_intent(q) != service.identify_intent(q)
+    ]
+    for query in mismatches:
+        print(f"MISMATCH {query!r}: {legacy_identify_intent(query)} != {service.identify_intent(query)}")
+    print(f"{len(corpus) - len(mismatches)}/{len(corpus)} queries agree with the per-pattern loop")
+
+    print(f"{'query':<82} {'loop µs':>8} {'compiled µs':>12}")
+    for query in QUERIES:
+        legacy = timeit.timeit(lambda: legacy_identify_intent(query), number=iterations) / iterations * 1e6
+        compiled = timeit.timeit(lambda: service.identify_intent(query), number=iterations) / iterations * 1e6
+        print(f"{query[:80]:<82} {legacy:8.2f} {compiled:12.2f}")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
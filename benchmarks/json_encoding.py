@@ -0,0 +1,79 @@
+"""
+Compare Flask's default JSON provider with FastJSONProvider on an insight
+payload built from the sample sales upload.
+
+    python -m benchmarks.json_encoding [iterations]
+"""
+import os
+import sys
+import timeit
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import pandas as pd
+
+from app.utils.json_provider import FastJSONProvider, orjson
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+
+def build_sales_payload():
+    # Same shape as Insight.get_analysis_data(), with every row kept in quantityVsPrice
+    # and values left as the Decimal/date objects the ORM returns
+    df = pd.read_csv(os.path.join(UPLOAD_FOLDER, 'sales_data_sample.csv'), encoding='ISO-8859-1')
+    df['ORDERDATE'] = pd.to_datetime(df['ORDERDATE'], errors='coerce')
+    sales_data = df.groupby('PRODUCTLINE')['SALES'].sum().reset_index().to_dict('records')
+    sales_over_time = df.resample('ME', on='ORDERDATE')['SALES'].sum().reset_index().to_dict('records')
+    quantity_vs_price = df[['QUANTITYORDERED', 'PRICEEACH']].to_dict('records')
+    return {
+        'salesData': [
+            {'PRODUCTLINE': row['PRODUCTLINE'], 'SALES': Decimal(f"{row['SALES']:.2f}")}
+            for row in sales_data
+        ],
+        'orderStatus': df['STATUS'].value_counts().reset_index().to_dict('records'),
+        'salesOverTime': [
+            {'ORDERDATE': row['ORDERDATE'].date(), 'SALES': Decimal(f"{row['SALES']:.2f}")}
+            for row in sales_over_time
+        ],
+        'quantityVsPrice': [
+            {'QUANTITYORDERED': row['QUANTITYORDERED'], 'PRICEEACH': Decimal(f"{row['PRICEEACH']:.2f}")}
+            for row in quantity_vs_price
+        ],
+    }
+
+def hand_convert(payload):
+    # What get_analysis_data() does today before Flask's encoder sees the data
+    return {
+        'salesData': [{'PRODUCTLINE': r['PRODUCTLINE'], 'SALES': float(r['SALES'])} for r in payload['salesData']],
+        'orderStatus': payload['orderStatus'],
+        'salesOverTime': [
+            {'ORDERDATE': r['ORDERDATE'].strftime('%Y-%m-%d'), 'SALES': float(r['SALES'])}
+            for r in payload['salesOverTime']
+        ],
+        'quantityVsPrice': [
+            {'QUANTITYORDERED': r['QUANTITYORDERED'], 'PRICEEACH': float(r['PRICEEACH'])}
+            for r in payload['quantityVsPrice']
+        ],
+    }
+
+def main(iterations=50):
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    payload = build_sales_payload()
+    converted = hand_convert(payload)
+
+    runs = {
+        'flask default + hand conversion': lambda: default_provider.dumps(hand_convert(payload)),
+        'flask default (pre-converted)': lambda: default_provider.dumps(converted),
+        'fast provider (native types)': lambda: fast_provider.dumps(payload),
+    }
+
+    print(f"Backend: {'orjson' if orjson else 'json (orjson not installed)'}")
+    print(f"Payload: {len(fast_provider.dumps(payload)) / 1024:,.0f} KiB, "
+          f"{len(payload['quantityVsPrice']):,} quantityVsPrice rows, {iterations} iterations")
+    for label, run in runs.items():
+        seconds = timeit.timeit(run, number=iterations)
+        print(f"  {label:<34} {seconds / iterations * 1000:8.2f} ms/encode")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,68 @@
+"""
+Print SQL Server's estimated plans for the date-scoped insight queries and
+check that each one seeks on the index added in migration 5b7f2c9d41ae.
+
+    python -m benchmarks.query_plans
+
+Exits with status 1 if any query scans instead. Run it against a database
+with representative row counts: on near-empty tables the optimizer may
+legitimately prefer a scan.
+"""
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.models.operational import ChatMessage, File, Insight, SalesData
+from app.utils.dates import day_range
+
+def build_queries():
+    user_id = str(uuid.uuid4())
+    insight_id = str(uuid.uuid4())
+    day_start, day_end = day_range(datetime.utcnow())
+    _, cutoff_end = day_range(datetime.utcnow() - timedelta(days=3))
+
+    return [
+        ('daily insight quota', 'ix_Insights_user_id_created_at', Insight.query.filter(
+            Insight.user_id == user_id, Insight.created_at >= day_start, Insight.created_at < day_end
+        ).with_entities(db.func.count(Insight.id))),
+        ("today's insight", 'ix_Insights_user_id_created_at', Insight.query.filter(
+            Insight.user_id == user_id, Insight.created_at >= day_start, Insight.created_at < day_end
+        ).order_by(Insight.created_at.desc()).limit(1)),
+        ('archive candidates', 'ix_Insights_created_at', Insight.query.filter(
+            Insight.created_at < cutoff_end
+        ).with_entities(Insight.id)),
+        ('insight files', 'ix_Files_insight_id', File.query.filter(File.insight_id == insight_id)),
+        ('insight sales data', 'ix_SalesData_insight_id', SalesData.query.filter(SalesData.insight_id == insight_id)),
+        ('chat history', 'ix_ChatMessage_insight_id', ChatMessage.query.filter(ChatMessage.insight_id == insight_id)),
+    ]
+
+def estimated_plan(connection, query):
+    compiled = query.statement.compile(dialect=connection.dialect)
+    params = tuple(
+        str(value) if isinstance(value, uuid.UUID) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    connection.exec_driver_sql('SET SHOWPLAN_TEXT ON')
+    try:
+        rows = connection.exec_driver_sql(str(compiled), params).fetchall()
+    finally:
+        connection.exec_driver_sql('SET SHOWPLAN_TEXT OFF')
+    return '\n'.join(row[0] for row in rows)
+
+def main():
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        with db.engines['operational'].connect() as connection:
+            for label, index_name, query in build_queries():
+                plan = estimated_plan(connection, query)
+                seeks = any('Index Seek' in line and index_name in line for line in plan.splitlines())
+                failures += not seeks
+                print(f"[{'seek' if seeks else 'SCAN'}] {label} ({index_name})")
+                if not seeks:
+                    print(plan)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
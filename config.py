@@ -1,5 +1,6 @@
 # config.py
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +8,7 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key'
     JWT_SECRET_KEY = 'your-jwt-secret-key'  
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
     SQLALCHEMY_DATABASE_URI = 'mssql+pyodbc://./BusinessIntelligence_AuthDB?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes'
     SQLALCHEMY_BINDS  = { 
         'operational': 'mssql+pyodbc://./BusinessIntelligence_OperationalDB?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes',
@@ -15,6 +17,57 @@ class Config:
     }
     SQLALCHEMY_TRACK_MODIFICATIONS = False  
     UPLOAD_FOLDER  = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    HTTP_CACHE_MAX_AGE = 0  # seconds; 0 makes clients revalidate every poll
+    FAST_JSON_PROVIDER = True  # orjson-backed encoder; falls back to json when orjson is missing
+    STREAM_BATCH_SIZE = 50  # rows fetched per keyset page by streamed list endpoints
+    CHAT_HISTORY_PAGE_SIZE = 50  # default limit for paged chat history
+    CHAT_HISTORY_MAX_PAGE_SIZE = 200
+    ARCHIVED_INSIGHTS_PAGE_SIZE = 50  # default limit for paged archived insight listings
+    ARCHIVED_INSIGHTS_MAX_PAGE_SIZE = 200
+    COMPRESS_ENABLED = True
+    COMPRESS_ALGORITHMS = ['zstd', 'br', 'gzip']  # server preference among what the client accepts
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies are sent as-is
+    COMPRESS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    INTENT_CLASSIFIER_ENABLED = False  # regex and fuzzy matching are used alone when off
+    INTENT_CLASSIFIER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'intent_classifier.joblib')
+    INTENT_CLASSIFIER_MIN_CONFIDENCE = 0.6  # below this the regex matcher decides
+    CHATBOT_BATCH_MAX_QUERIES = 20  # per request to /chat/chatbot/<id>/batch
+    ADHOC_QUERIES_ENABLED = True  # answer filtered questions from the uploaded rows
+    COLUMNAR_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'columnar')
+    COLUMNAR_CACHE_TABLES = 8  # insights kept loaded per worker
+    CHAT_WRITE_BEHIND_ENABLED = True  # persist chat messages from a background thread
+    CHAT_WRITE_BATCH_SIZE = 50
+    CHAT_WRITE_FLUSH_INTERVAL = 0.2  # seconds a queued message may wait for its batch
+    CHAT_WRITE_FLUSH_TIMEOUT = 5  # seconds history reads and shutdown wait for the queue
+    CHAT_WRITE_MAX_BACKOFF = 30  # seconds between retries while the database rejects writes
+    CHAT_WRITE_MAX_ATTEMPTS = 3  # failed batch writes before its rows are written one at a time
+    CHAT_WRITE_SPILL_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'chat_spill')  # unwritten messages saved at shutdown
+    CHAT_WRITE_DEAD_LETTER_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'chat_dead_letter')  # messages that could not be written at all
+    ARCHIVE_CUTOFF_DAYS = 3  # insights older than this are archived, unless their plan sets its own
+    ARCHIVE_PLAN_CUTOFF_DAYS = {'Basic': 7, 'Pro': 14, 'Enterprise': 30}  # by subscription PlanName
+    ARCHIVE_WINDOWS = [('01:00', '05:00')]  # UTC; archiving only runs inside these, [] for any time
+    ARCHIVE_CHECK_INTERVAL_MINUTES = 15  # how often the scheduler looks for an open window
+    ARCHIVE_MAX_ROWS_PER_SECOND = 5000  # None for unthrottled
+    ARCHIVE_PAUSE_LATENCY_MS = 1000  # hold archiving while p95 request latency across all workers is above this
+    ARCHIVE_PAUSE_LOCK_WAIT_MS = 2000  # hold archiving while a session has waited this long for a lock
+    ARCHIVE_PAUSE_SECONDS = 30  # between load checks while held
+    REQUEST_TIMING_WINDOW = 60  # seconds of requests the latency percentile covers
+    REQUEST_TIMING_PUBLISH_SECONDS = 15  # how often each process shares its request latencies with the others
+    ARCHIVE_BATCH_SIZE = 100  # insights moved and committed per archive transaction
+    ARCHIVE_COPY_CHUNK_SIZE = 5000  # rows per insert when streaming between database servers
+    ARCHIVE_CROSS_DATABASE_COPY = True  # INSERT...SELECT when both databases share a SQL Server instance
+    ARCHIVE_STORAGE_FORMAT = 'document'  # 'document': one compressed row per insight; 'tables': Archived* row copies
+    UNARCHIVE_JOB_STALE_MINUTES = 30  # queued or running restores this old are taken over at startup
+    COLD_STORAGE_ENABLED = True  # move archived raw uploads to the compressed cold tier
+    COLD_STORAGE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'cold')
+    COLD_STORAGE_MAX_AGE_DAYS = 365  # cold uploads untouched this long are deleted; None keeps them
+    COLD_STORAGE_MAX_BYTES = None  # size budget for the cold tier, oldest deleted first; None is unbounded
+    SUBSCRIPTION_CACHE_TTL = 300  # seconds a worker trusts its cached subscription and used-up quotas
+    SUBSCRIPTION_CACHE_SIZE = 10000  # users cached per worker
+    PLAN_CHANGE_POLL_SECONDS = 30  # how stale a worker's view of plan changes, and so of token plan claims, can be
+    SCHEDULER_LEADER_ELECTION = True  # run scheduled jobs in one process per cluster
+    LEADER_LEASE_TTL = 60  # seconds before a silent leader's lease can be taken over
+    LEADER_HEARTBEAT_INTERVAL = 15  # seconds between lease renewals
 
 class DevelopmentConfig(Config):
     DEBUG = True